@@ -1,47 +1,528 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Awaitable, Callable, Mapping
+
 from fastapi import HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
 import httpx
 
-from app.config.config import ServicesConfig
+from app.clients.upstream_registry import UpstreamInstance, UpstreamRegistry
+from app.config.config import (
+    ConcurrencyLimitSettings,
+    HttpClientSettings,
+    ServiceConfig,
+    ServicesConfig,
+)
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.concurrency_limiter import (
+    AdaptiveConcurrencyLimiter,
+    ConcurrencyLimitExceeded,
+)
+from app.utils.latency_tracker import LatencyTracker
+from app.utils.metrics import (
+    UPSTREAM_CONCURRENCY_LIMIT,
+    UPSTREAM_DURATION,
+    UPSTREAM_IN_FLIGHT,
+    UPSTREAM_RESPONSES,
+    UPSTREAM_SHED,
+)
+from app.utils.retry_budget import RetryBudget
+
+
+HOP_BY_HOP_HEADERS = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailers",
+    "transfer-encoding",
+    "upgrade",
+}
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+RETRYABLE_STATUSES = {502, 503, 504}
+
+AUTH_LIMIT_GROUP = "auth"
+
+PUBLIC_LIMIT_GROUP = "public"
+
+DEFAULT_LIMIT_GROUP = "api"
+
+
+@dataclass
+class ServiceResilience:
+    breaker: CircuitBreaker
+    retry_budget: RetryBudget
+    latency: LatencyTracker
 
 
 class RerouteRequestToServiceClient:
-    def __init__(self, config: ServicesConfig):
+    def __init__(
+        self,
+        config: ServicesConfig,
+        http_settings: HttpClientSettings,
+        limit_settings: ConcurrencyLimitSettings,
+        registry: UpstreamRegistry,
+    ):
         self.__global_config = config
+        self.__http_settings = http_settings
+        self.__limit_settings = limit_settings
+        self.__registry = registry
+        self.__clients: dict[str, httpx.AsyncClient] = {}
+        self.__resilience: dict[str, ServiceResilience] = {}
+        self.__limiters: dict[tuple[str, str], AdaptiveConcurrencyLimiter] = {}
+        self.__closing: set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        for service_name in self.__global_config.services():
+            self.__get_client(service_name)
+
+    async def aclose(self) -> None:
+        clients, self.__clients = self.__clients, {}
+        for client in clients.values():
+            await client.aclose()
+        for task in list(self.__closing):
+            task.cancel()
+        await asyncio.gather(*self.__closing, return_exceptions=True)
+
+    def remove_services(self, service_names: set[str]) -> None:
+        """Drop the pools, breakers and limits of services no longer routed.
+
+        Requests already sent keep the client, it is closed once they have
+        had the upstream timeout to finish.
+        """
+        for service_name in service_names:
+            self.__resilience.pop(service_name, None)
+            for key in [key for key in self.__limiters if key[0] == service_name]:
+                del self.__limiters[key]
+            client = self.__clients.pop(service_name, None)
+            if client is not None:
+                task = asyncio.create_task(self.__close_later(client))
+                self.__closing.add(task)
+                task.add_done_callback(self.__closing.discard)
+
+    async def __close_later(self, client: httpx.AsyncClient) -> None:
+        try:
+            await asyncio.sleep(self.__http_settings.timeout)
+        finally:
+            await client.aclose()
 
     async def reroute_request(
-        self, request: Request, service_name: str, path: str, method: str = None
+        self,
+        request: Request,
+        service_name: str,
+        path: str,
+        method: str = None,
+        stream: bool = None,
+        limit_group: str = None,
     ):
-        target_url = self.__construct_url(service_name, path)
-        async with httpx.AsyncClient() as client:
+        """Proxy the request to the service.
+
+        In streaming mode request and response bodies are piped chunk by chunk
+        and the upstream content-type and encodings are kept untouched.
+        Responses the gateway cache is going to store are always buffered.
+        """
+        if stream is None:
+            stream = self.__http_settings.stream_responses and not getattr(
+                request.state, "cacheable", False
+            )
+        if limit_group is None:
+            limit_group = getattr(request.state, "limit_group", DEFAULT_LIMIT_GROUP)
+        method = method if method else request.method
+        if stream:
+            return await self.__stream_request(
+                service_name, request, path, method, limit_group
+            )
+
+        try:
+            body = await request.body()
+            response = await self.send(
+                service_name=service_name,
+                path=path,
+                method=method,
+                headers=request.headers,
+                params=request.query_params,
+                content=body,
+                limit_group=limit_group,
+            )
+
+            # httpx has already decoded the body, so its original encoding and
+            # length no longer apply.
+            return Response(
+                content=response.content,
+                status_code=response.status_code,
+                headers={
+                    name: value
+                    for name, value in response.headers.items()
+                    if name not in HOP_BY_HOP_HEADERS
+                    and name not in ("content-encoding", "content-length")
+                },
+            )
+
+        except HTTPException:
+            raise
+        except httpx.TimeoutException:
+            raise HTTPException(status_code=504, detail="Service timeout")
+        except httpx.TransportError:
+            raise HTTPException(status_code=502, detail="Service connection error")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail="Internal server error")
+
+    async def send(
+        self,
+        service_name: str,
+        path: str,
+        method: str,
+        headers: Mapping[str, str],
+        params: Any = None,
+        content: bytes | None = None,
+        limit_group: str = DEFAULT_LIMIT_GROUP,
+    ) -> httpx.Response:
+        """Send a buffered request to the service, detached from any Request.
+
+        Each service has a circuit breaker and an adaptive concurrency limit
+        per group of endpoints. Failed idempotent requests are retried on
+        another pick of instance while the retry budget allows it, and GET
+        requests slower than the configured latency percentile are hedged
+        with a second request, the first response wins.
+        """
+        service_name = service_name.lower()
+        config = self.__get_service_config(service_name)
+        resilience = self.__get_resilience(service_name)
+        self.__check_breaker(service_name, resilience)
+        limiter = self.__get_limiter(service_name, limit_group)
+        await self.__acquire_slot(service_name, limit_group, limiter)
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await self.__send_with_retries(
+                service_name,
+                config,
+                resilience,
+                method=method,
+                path=path,
+                headers=headers,
+                params=params,
+                content=content,
+            )
+            return response
+        finally:
+            self.__release_slot(
+                service_name,
+                limit_group,
+                limiter,
+                time.perf_counter() - started,
+                dropped=response is None
+                or response.status_code in RETRYABLE_STATUSES,
+            )
+
+    async def __send_with_retries(
+        self,
+        service_name: str,
+        config: ServiceConfig,
+        resilience: ServiceResilience,
+        method: str,
+        path: str,
+        headers: Mapping[str, str],
+        params: Any,
+        content: bytes | None,
+    ) -> httpx.Response:
+        resilience.retry_budget.deposit()
+
+        attempt = partial(
+            self.__attempt,
+            service_name,
+            config,
+            resilience,
+            method=method,
+            path=path,
+            headers=self.__upstream_headers(headers),
+            params=params,
+            content=content,
+        )
+        hedge = method == "GET" and self.__http_settings.hedge_percentile > 0
+        retries = (
+            self.__http_settings.max_retries if method in IDEMPOTENT_METHODS else 0
+        )
+        for attempt_number in range(retries + 1):
+            response, error = None, None
             try:
-                headers = dict(request.headers)
-                headers.pop("host", None)
-                headers.pop("content-length", None)
-                body = await request.body()
-                method = method if method else request.method
+                if hedge:
+                    response = await self.__hedged(attempt, resilience)
+                else:
+                    response = await attempt()
+            except httpx.TransportError as e:
+                error = e
+            if response is not None and response.status_code not in RETRYABLE_STATUSES:
+                resilience.breaker.record_success()
+                return response
+            resilience.breaker.record_failure()
+            if attempt_number == retries or not resilience.retry_budget.try_withdraw():
+                break
+        if response is not None:
+            return response
+        raise error
+
+    async def __attempt(
+        self,
+        service_name: str,
+        config: ServiceConfig,
+        resilience: ServiceResilience,
+        method: str,
+        path: str,
+        headers: dict[str, str],
+        params: Any,
+        content: bytes | None,
+    ) -> httpx.Response:
+        client = self.__get_client(service_name)
+        instance = self.__registry.choose(service_name, config)
+        started = time.perf_counter()
+        try:
+            with self.__registry.track(instance):
                 response = await client.request(
                     method=method,
-                    url=target_url,
+                    url=self.__construct_url(instance, config, path),
                     headers=headers,
-                    content=body,
-                    params=request.query_params,
-                    timeout=10.0,
+                    content=content,
+                    params=params,
                 )
+        except httpx.TransportError:
+            UPSTREAM_RESPONSES.labels(service_name, "error").inc()
+            raise
+        latency = time.perf_counter() - started
+        resilience.latency.record(latency)
+        UPSTREAM_DURATION.labels(service_name).observe(latency)
+        UPSTREAM_RESPONSES.labels(service_name, str(response.status_code)).inc()
+        return response
+
+    @staticmethod
+    async def __hedged(
+        attempt: Callable[[], Awaitable[httpx.Response]],
+        resilience: ServiceResilience,
+    ) -> httpx.Response:
+        first = asyncio.create_task(attempt())
+        delay = resilience.latency.value
+        if delay is None:
+            return await first
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done or not resilience.retry_budget.try_withdraw():
+            return await first
 
-                return JSONResponse(
-                    content=response.json(),
-                    status_code=response.status_code,
-                    headers=dict(response.headers),
+        pending = {first, asyncio.create_task(attempt())}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
                 )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def __check_breaker(
+        self, service_name: str, resilience: ServiceResilience
+    ) -> None:
+        if not resilience.breaker.allow_request():
+            UPSTREAM_SHED.labels(service_name, "breaker").inc()
+            raise HTTPException(
+                status_code=503,
+                detail="Service unavailable",
+                headers={
+                    "Retry-After": str(
+                        int(self.__http_settings.breaker_reset_timeout)
+                    )
+                },
+            )
+
+    async def __acquire_slot(
+        self, service_name: str, limit_group: str, limiter: AdaptiveConcurrencyLimiter
+    ) -> None:
+        # Shedding right away keeps latency and goodput stable under overload,
+        # waiting for the upstream timeout would only pile up more requests.
+        try:
+            await limiter.acquire()
+        except ConcurrencyLimitExceeded:
+            UPSTREAM_SHED.labels(service_name, "overloaded").inc()
+            raise HTTPException(
+                status_code=503,
+                detail="Service overloaded",
+                headers={"Retry-After": str(self.__limit_settings.retry_after)},
+            )
+        UPSTREAM_IN_FLIGHT.labels(service_name, limit_group).inc()
 
-            except httpx.ConnectError:
-                raise HTTPException(status_code=502, detail="Service connection error")
-            except Exception as e:
-                raise HTTPException(status_code=500, detail="Internal server error")
+    @staticmethod
+    def __release_slot(
+        service_name: str,
+        limit_group: str,
+        limiter: AdaptiveConcurrencyLimiter,
+        latency: float | None = None,
+        dropped: bool = False,
+    ) -> None:
+        limiter.release(latency, dropped)
+        UPSTREAM_IN_FLIGHT.labels(service_name, limit_group).dec()
+        UPSTREAM_CONCURRENCY_LIMIT.labels(service_name, limit_group).set(limiter.limit)
 
-    def __construct_url(self, service_name: str, path: str):
+    def __get_limiter(
+        self, service_name: str, limit_group: str
+    ) -> AdaptiveConcurrencyLimiter:
+        limiter = self.__limiters.get((service_name, limit_group))
+        if limiter is None:
+            settings = self.__limit_settings
+            max_limit = {
+                AUTH_LIMIT_GROUP: settings.auth_max_limit,
+                PUBLIC_LIMIT_GROUP: settings.public_max_limit,
+            }.get(limit_group, settings.max_limit)
+            limiter = AdaptiveConcurrencyLimiter(
+                initial_limit=min(settings.initial_limit, max_limit),
+                min_limit=settings.min_limit,
+                max_limit=max_limit,
+                queue_size=settings.queue_size,
+                queue_timeout=settings.queue_timeout,
+                latency_tolerance=settings.latency_tolerance,
+            )
+            self.__limiters[(service_name, limit_group)] = limiter
+        return limiter
+
+    def __get_resilience(self, service_name: str) -> ServiceResilience:
+        resilience = self.__resilience.get(service_name)
+        if resilience is None:
+            settings = self.__http_settings
+            resilience = ServiceResilience(
+                breaker=CircuitBreaker(
+                    failure_threshold=settings.breaker_failure_threshold,
+                    reset_timeout=settings.breaker_reset_timeout,
+                ),
+                retry_budget=RetryBudget(
+                    ratio=settings.retry_budget_ratio,
+                    min_retries=settings.retry_budget_min,
+                ),
+                latency=LatencyTracker(percentile=settings.hedge_percentile),
+            )
+            self.__resilience[service_name] = resilience
+        return resilience
+
+    async def __stream_request(
+        self,
+        service_name: str,
+        request: Request,
+        path: str,
+        method: str,
+        limit_group: str,
+    ) -> StreamingResponse:
+        service_name = service_name.lower()
+        config = self.__get_service_config(service_name)
+        resilience = self.__get_resilience(service_name)
+        self.__check_breaker(service_name, resilience)
+        limiter = self.__get_limiter(service_name, limit_group)
+        await self.__acquire_slot(service_name, limit_group, limiter)
+        client = self.__get_client(service_name)
+        instance = self.__registry.choose(service_name, config)
+        upstream_request = client.build_request(
+            method=method,
+            url=self.__construct_url(instance, config, path),
+            headers=self.__upstream_headers(request.headers),
+            content=request.stream() if self.__has_body(request) else None,
+            params=request.query_params,
+        )
+        # The instance stays busy until the response body has been streamed.
+        self.__registry.acquire(instance)
+        started = time.perf_counter()
+        try:
+            response = await client.send(upstream_request, stream=True)
+        except httpx.TransportError as e:
+            self.__registry.release(instance, e)
+            self.__release_slot(service_name, limit_group, limiter, dropped=True)
+            UPSTREAM_RESPONSES.labels(service_name, "error").inc()
+            resilience.breaker.record_failure()
+            if isinstance(e, httpx.TimeoutException):
+                raise HTTPException(status_code=504, detail="Service timeout")
+            raise HTTPException(status_code=502, detail="Service connection error")
+        except Exception as e:
+            self.__registry.release(instance, e)
+            self.__release_slot(service_name, limit_group, limiter, dropped=True)
+            UPSTREAM_RESPONSES.labels(service_name, "error").inc()
+            resilience.breaker.record_failure()
+            raise HTTPException(status_code=500, detail="Internal server error")
+        # Time to headers is what the limit adapts to, body size is up to the
+        # client and says nothing about how loaded the upstream is.
+        latency = time.perf_counter() - started
+        UPSTREAM_DURATION.labels(service_name).observe(latency)
+        UPSTREAM_RESPONSES.labels(service_name, str(response.status_code)).inc()
+        dropped = response.status_code in RETRYABLE_STATUSES
+        if dropped:
+            resilience.breaker.record_failure()
+        else:
+            resilience.breaker.record_success()
+
+        async def close() -> None:
+            await response.aclose()
+            self.__registry.release(instance)
+            self.__release_slot(service_name, limit_group, limiter, latency, dropped)
+
+        return StreamingResponse(
+            response.aiter_raw(),
+            status_code=response.status_code,
+            headers={
+                name: value
+                for name, value in response.headers.items()
+                if name not in HOP_BY_HOP_HEADERS
+            },
+            background=BackgroundTask(close),
+        )
+
+    @staticmethod
+    def __upstream_headers(request_headers: Mapping[str, str]) -> dict[str, str]:
+        headers = dict(request_headers)
+        headers.pop("host", None)
+        headers.pop("content-length", None)
+        for name in HOP_BY_HOP_HEADERS:
+            headers.pop(name, None)
+        return headers
+
+    @staticmethod
+    def __has_body(request: Request) -> bool:
+        return (
+            request.headers.get("content-length", "0") != "0"
+            or "transfer-encoding" in request.headers
+        )
+
+    def __get_service_config(self, service_name: str) -> ServiceConfig:
         config = self.__global_config.get_service_config(service_name)
-        r = f"{config.base_url}{config.prefix}/{path}"
-        print("!!!!!!", r)
-        return r
+        if config is None:
+            raise HTTPException(status_code=404, detail="Service not found")
+        return config
+
+    def __get_client(self, service_name: str) -> httpx.AsyncClient:
+        # One pool per service, httpx keeps connections per instance origin.
+        client = self.__clients.get(service_name)
+        if client is None:
+            settings = self.__http_settings
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.max_connections,
+                    max_keepalive_connections=settings.max_keepalive_connections,
+                    keepalive_expiry=settings.keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(
+                    settings.timeout, connect=settings.connect_timeout
+                ),
+                http2=settings.http2,
+            )
+            self.__clients[service_name] = client
+        return client
+
+    @staticmethod
+    def __construct_url(
+        instance: UpstreamInstance, config: ServiceConfig, path: str
+    ) -> str:
+        return f"{instance.url}{config.prefix}/{path}"
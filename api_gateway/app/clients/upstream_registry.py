@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import random
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import httpx
+
+from app.config.config import HealthCheckSettings, ServiceConfig, ServicesConfig
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class UpstreamInstance:
+    url: str
+    healthy: bool = True
+    outstanding: int = 0
+    failures: int = 0
+    unhealthy_since: float = 0.0
+
+
+class UpstreamPool:
+    """Instances of one service, balanced by outstanding requests."""
+
+    def __init__(
+        self, config: ServiceConfig, balancer: str, previous: "UpstreamPool" = None
+    ):
+        self.config = config
+        self.balancer = balancer
+        # Instances kept across a config reload keep their health and load.
+        known = {}
+        if previous is not None:
+            known = {instance.url: instance for instance in previous.instances}
+        self.instances = [
+            known.get(url) or UpstreamInstance(url=url) for url in config.instances
+        ]
+
+    def choose(self) -> UpstreamInstance:
+        # With every instance down we still try one rather than fail outright.
+        candidates = [instance for instance in self.instances if instance.healthy]
+        candidates = candidates or self.instances
+        if len(candidates) == 1:
+            return candidates[0]
+        if self.balancer == "least_outstanding":
+            lowest = min(instance.outstanding for instance in candidates)
+            return random.choice(
+                [instance for instance in candidates if instance.outstanding == lowest]
+            )
+        first, second = random.sample(candidates, 2)
+        return first if first.outstanding <= second.outstanding else second
+
+
+class UpstreamRegistry:
+    """Keeps track of service instances and probes their health endpoints.
+
+    An instance is taken out of rotation after ``unhealthy_threshold``
+    consecutive failed probes or connection errors; any successful probe or
+    request resets the count. It is put back after the first successful
+    probe, or for services without a health check after
+    ``unhealthy_cooldown`` seconds, on probation: one more connection error
+    takes it out again.
+    """
+
+    def __init__(self, config: ServicesConfig, settings: HealthCheckSettings):
+        self.__global_config = config
+        self.settings = settings
+        self.__pools: dict[str, UpstreamPool] = {}
+        self.__client: httpx.AsyncClient | None = None
+        self.__task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        self.__client = httpx.AsyncClient(timeout=self.settings.timeout)
+        self.__task = asyncio.create_task(self.__check_periodically())
+
+    async def stop(self) -> None:
+        if self.__task is not None:
+            self.__task.cancel()
+            await asyncio.gather(self.__task, return_exceptions=True)
+            self.__task = None
+        if self.__client is not None:
+            await self.__client.aclose()
+            self.__client = None
+
+    def choose(self, service_name: str, config: ServiceConfig) -> UpstreamInstance:
+        pool = self.__get_pool(service_name, config)
+        if not config.health_check:
+            self.__readmit_cooled_down(pool)
+        return pool.choose()
+
+    def remove_services(self, service_names: set[str]) -> None:
+        for service_name in service_names:
+            self.__pools.pop(service_name, None)
+
+    def acquire(self, instance: UpstreamInstance) -> None:
+        instance.outstanding += 1
+
+    def release(
+        self, instance: UpstreamInstance, error: BaseException | None = None
+    ) -> None:
+        instance.outstanding -= 1
+        if error is None:
+            self.report_success(instance)
+        elif isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout)):
+            self.report_failure(instance)
+
+    @contextmanager
+    def track(self, instance: UpstreamInstance):
+        """Count an in-flight request and report connection failures."""
+        self.acquire(instance)
+        try:
+            yield instance
+        except BaseException as e:
+            self.release(instance, e)
+            raise
+        self.release(instance)
+
+    def report_failure(self, instance: UpstreamInstance) -> None:
+        instance.failures += 1
+        if instance.failures >= self.settings.unhealthy_threshold:
+            if instance.healthy:
+                logger.warning("Upstream instance url=%s marked unhealthy", instance.url)
+                instance.unhealthy_since = time.monotonic()
+            instance.healthy = False
+
+    def report_success(self, instance: UpstreamInstance) -> None:
+        if not instance.healthy:
+            logger.info("Upstream instance url=%s is healthy again", instance.url)
+        instance.failures = 0
+        instance.healthy = True
+
+    def __readmit_cooled_down(self, pool: UpstreamPool) -> None:
+        now = time.monotonic()
+        for instance in pool.instances:
+            if (
+                not instance.healthy
+                and now - instance.unhealthy_since >= self.settings.unhealthy_cooldown
+            ):
+                logger.info("Upstream instance url=%s back after cooldown", instance.url)
+                instance.healthy = True
+                instance.failures = max(0, self.settings.unhealthy_threshold - 1)
+
+    def __get_pool(self, service_name: str, config: ServiceConfig) -> UpstreamPool:
+        pool = self.__pools.get(service_name)
+        if pool is None or pool.config is not config:
+            pool = UpstreamPool(config, self.settings.balancer, previous=pool)
+            self.__pools[service_name] = pool
+        return pool
+
+    async def __check_periodically(self) -> None:
+        while True:
+            checks = []
+            for service_name, config in self.__global_config.services().items():
+                if not config.health_check:
+                    continue
+                pool = self.__get_pool(service_name, config)
+                checks.extend(self.__check(pool, instance) for instance in pool.instances)
+            await asyncio.gather(*checks)
+            await asyncio.sleep(self.settings.interval)
+
+    async def __check(self, pool: UpstreamPool, instance: UpstreamInstance) -> None:
+        try:
+            response = await self.__client.get(
+                f"{instance.url}{pool.config.health_check}"
+            )
+            healthy = response.status_code < 500
+        except Exception:
+            healthy = False
+        if healthy:
+            self.report_success(instance)
+        else:
+            self.report_failure(instance)
@@ -1,44 +1,133 @@
+import fnmatch
 import json
 import os
-from dataclasses import dataclass
+import re
+from dataclasses import dataclass, field
 from pathlib import Path
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
 
+@dataclass
+class CachePolicy:
+    enabled: bool = True
+    ttl: int | None = None
+    stale_ttl: int | None = None
+    cacheable_statuses: list[int] = field(default_factory=lambda: [200])
+    vary_headers: list[str] = field(default_factory=list)
+    # Cached GET paths of the same service dropped after a successful write
+    # to the route.
+    invalidates: list[str] = field(default_factory=list)
+
+
 @dataclass
 class ServiceConfig:
-    base_url: str
-    prefix: str
-    health_check: str
+    base_url: str = ""
+    prefix: str = ""
+    health_check: str = ""
     public_endpoints: list[str] = None
+    instances: list[str] = field(default_factory=list)
+    cache: CachePolicy = field(default_factory=CachePolicy)
+    cache_routes: dict[str, CachePolicy] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if not self.instances:
+            self.instances = [self.base_url]
+        if isinstance(self.cache, dict):
+            self.cache = CachePolicy(**self.cache)
+        self.cache_routes = {
+            pattern: CachePolicy(**policy) if isinstance(policy, dict) else policy
+            for pattern, policy in self.cache_routes.items()
+        }
+        # Patterns are compiled once per config load, not on every request.
+        self.__public_matcher = _compile_patterns(self.public_endpoints or [])
+        self.__cache_route_matchers = [
+            (re.compile(fnmatch.translate(pattern)), policy)
+            for pattern, policy in self.cache_routes.items()
+        ]
+
+    def is_public(self, path: str) -> bool:
+        """Whether the path matches one of the public endpoint patterns."""
+        return (
+            self.__public_matcher is not None
+            and self.__public_matcher.match(path.lstrip("/")) is not None
+        )
+
+    def get_cache_policy(self, path: str) -> CachePolicy:
+        """Return the policy of the first route pattern matching the path."""
+        for matcher, policy in self.__cache_route_matchers:
+            if matcher.match(path):
+                return policy
+        return self.cache
+
+
+def _compile_patterns(patterns: list[str]) -> re.Pattern | None:
+    if not patterns:
+        return None
+    return re.compile(
+        "|".join(fnmatch.translate(pattern.lstrip("/")) for pattern in patterns)
+    )
 
 
-@dataclass
 class ServicesConfig:
-    currency_service: ServiceConfig
-    users_service: ServiceConfig
+    """Routing table of the services behind the gateway, keyed by name.
+
+    ``reload`` swaps the whole table at once, so a request sees either the
+    old or the new set of services, and a ``ServiceConfig`` it already got
+    stays valid until it is done.
+    """
+
+    def __init__(
+        self,
+        services: dict[str, ServiceConfig],
+        file_path: str = None,
+        mtime: int = None,
+    ):
+        self.__services = services
+        self.file_path = file_path
+        self.__mtime = mtime
 
     @classmethod
     def from_json_file(cls, file_path: str):
+        # Stat before reading, an edit made while loading is picked up by
+        # the next reload.
+        mtime = os.stat(file_path).st_mtime_ns if os.path.isfile(file_path) else None
+        return cls(cls.__load(file_path), file_path, mtime)
+
+    @staticmethod
+    def __load(file_path: str) -> dict[str, ServiceConfig]:
         config_path = Path(file_path)
         if not os.path.isfile(config_path):
             raise FileNotFoundError(f"Config file not found: {config_path}")
         with open(config_path, "r", encoding="utf-8") as file:
             data = json.load(file)
 
-        return cls(
-            currency_service=ServiceConfig(**data["currency_service"]),
-            users_service=ServiceConfig(**data["users_service"]),
-        )
+        return {
+            name.lower(): ServiceConfig(**service) for name, service in data.items()
+        }
+
+    def services(self) -> dict[str, ServiceConfig]:
+        return self.__services
 
     def get_service_config(self, service: str) -> ServiceConfig | None:
-        service = service.lower()
-        if service == "currency_service":
-            return self.currency_service
-        if service == "users_service":
-            return self.users_service
-        return None
+        return self.__services.get(service.lower())
+
+    def reload(self) -> bool:
+        """Load the file again if it changed, returns whether it did.
+
+        Errors are raised once per change of the file and leave the current
+        table in place.
+        """
+        mtime = os.stat(self.file_path).st_mtime_ns
+        if mtime == self.__mtime:
+            return False
+        self.__mtime = mtime
+        self.__services = self.__load(self.file_path)
+        return True
+
+
+class ConfigReloadSettings(BaseSettings):
+    interval: float = Field(env="CONFIG_RELOAD_INTERVAL")
 
 
 class RedisSettings(BaseSettings):
@@ -47,9 +136,94 @@ class RedisSettings(BaseSettings):
     db: int = Field(env="REDIS_DB")
     password: str = Field(env="REDIS_PASSWORD")
     default_ttl: int = Field(env="REDIS_DEFAULT_TTL")
+    socket_timeout: float = Field(env="REDIS_SOCKET_TIMEOUT")
+    max_connections: int = Field(env="REDIS_MAX_CONNECTIONS")
+    pool_timeout: float = Field(env="REDIS_POOL_TIMEOUT")
+    auto_pipeline: bool = Field(env="REDIS_AUTO_PIPELINE")
 
     @property
     def url(self) -> str:
         if self.password:
             return f"redis://:{self.password}@{self.host}:{self.port}/{self.db}"
         return f"redis://{self.host}:{self.port}/{self.db}"
+
+
+class ClientSideCacheSettings(BaseSettings):
+    enabled: bool = Field(env="REDIS_CLIENT_CACHE_ENABLED")
+    prefixes: str = Field(env="REDIS_CLIENT_CACHE_PREFIXES")
+    max_bytes: int = Field(env="REDIS_CLIENT_CACHE_MAX_BYTES")
+    max_entries: int = Field(env="REDIS_CLIENT_CACHE_MAX_ENTRIES")
+    ttl: float = Field(env="REDIS_CLIENT_CACHE_TTL")
+
+    @property
+    def prefix_list(self) -> list[str]:
+        return [prefix.strip() for prefix in self.prefixes.split(",") if prefix.strip()]
+
+
+class HttpClientSettings(BaseSettings):
+    max_connections: int = Field(env="UPSTREAM_MAX_CONNECTIONS")
+    max_keepalive_connections: int = Field(env="UPSTREAM_MAX_KEEPALIVE_CONNECTIONS")
+    keepalive_expiry: float = Field(env="UPSTREAM_KEEPALIVE_EXPIRY")
+    timeout: float = Field(env="UPSTREAM_TIMEOUT")
+    connect_timeout: float = Field(env="UPSTREAM_CONNECT_TIMEOUT")
+    http2: bool = Field(env="UPSTREAM_HTTP2")
+    stream_responses: bool = Field(env="UPSTREAM_STREAM_RESPONSES")
+    max_retries: int = Field(env="UPSTREAM_MAX_RETRIES")
+    retry_budget_ratio: float = Field(env="UPSTREAM_RETRY_BUDGET_RATIO")
+    retry_budget_min: int = Field(env="UPSTREAM_RETRY_BUDGET_MIN")
+    breaker_failure_threshold: int = Field(env="UPSTREAM_BREAKER_FAILURE_THRESHOLD")
+    breaker_reset_timeout: float = Field(env="UPSTREAM_BREAKER_RESET_TIMEOUT")
+    hedge_percentile: float = Field(env="UPSTREAM_HEDGE_PERCENTILE")
+
+
+class ConcurrencyLimitSettings(BaseSettings):
+    initial_limit: int = Field(env="CONCURRENCY_LIMIT_INITIAL")
+    min_limit: int = Field(env="CONCURRENCY_LIMIT_MIN")
+    max_limit: int = Field(env="CONCURRENCY_LIMIT_MAX")
+    queue_size: int = Field(env="CONCURRENCY_LIMIT_QUEUE_SIZE")
+    queue_timeout: float = Field(env="CONCURRENCY_LIMIT_QUEUE_TIMEOUT")
+    latency_tolerance: float = Field(env="CONCURRENCY_LIMIT_LATENCY_TOLERANCE")
+    auth_max_limit: int = Field(env="CONCURRENCY_LIMIT_AUTH_MAX")
+    public_max_limit: int = Field(env="CONCURRENCY_LIMIT_PUBLIC_MAX")
+    retry_after: int = Field(env="CONCURRENCY_LIMIT_RETRY_AFTER")
+
+
+class BatchSettings(BaseSettings):
+    max_requests: int = Field(env="BATCH_MAX_REQUESTS")
+    item_timeout: float = Field(env="BATCH_ITEM_TIMEOUT")
+
+
+class LocalCacheSettings(BaseSettings):
+    max_bytes: int = Field(env="LOCAL_CACHE_MAX_BYTES")
+    max_entries: int = Field(env="LOCAL_CACHE_MAX_ENTRIES")
+    ttl: float = Field(env="LOCAL_CACHE_TTL")
+
+
+class CacheSettings(BaseSettings):
+    breaker_failure_threshold: int = Field(env="CACHE_BREAKER_FAILURE_THRESHOLD")
+    breaker_reset_timeout: float = Field(env="CACHE_BREAKER_RESET_TIMEOUT")
+    lock_timeout: float = Field(env="CACHE_LOCK_TIMEOUT")
+    lock_poll_interval: float = Field(env="CACHE_LOCK_POLL_INTERVAL")
+    stale_ttl: int = Field(env="CACHE_STALE_TTL")
+    compression_level: int = Field(env="CACHE_COMPRESSION_LEVEL")
+
+
+class JWTSettings(BaseSettings):
+    key: str = Field(env="SECRET_KEY")
+    algorithm: str = Field(env="ALGORITHM")
+    jwks_path: str = Field(env="JWT_JWKS_PATH")
+    jwks_refresh_interval: float = Field(env="JWT_JWKS_REFRESH_INTERVAL")
+
+
+class RevocationFilterSettings(BaseSettings):
+    capacity: int = Field(env="REVOCATION_FILTER_CAPACITY")
+    error_rate: float = Field(env="REVOCATION_FILTER_ERROR_RATE")
+    sync_interval: float = Field(env="REVOCATION_FILTER_SYNC_INTERVAL")
+
+
+class HealthCheckSettings(BaseSettings):
+    interval: float = Field(env="UPSTREAM_HEALTH_CHECK_INTERVAL")
+    timeout: float = Field(env="UPSTREAM_HEALTH_CHECK_TIMEOUT")
+    unhealthy_threshold: int = Field(env="UPSTREAM_UNHEALTHY_THRESHOLD")
+    unhealthy_cooldown: float = Field(env="UPSTREAM_UNHEALTHY_COOLDOWN")
+    balancer: str = Field(env="UPSTREAM_BALANCER")
@@ -2,18 +2,38 @@ from dependency_injector import containers, providers
 
 
 from app.clients.reroute_request_client import RerouteRequestToServiceClient
+from app.clients.upstream_registry import UpstreamRegistry
 from app.config.config import ServicesConfig
+from app.config.config import ConfigReloadSettings
 from app.config.config import RedisSettings
+from app.config.config import ClientSideCacheSettings
+from app.config.config import HttpClientSettings
+from app.config.config import ConcurrencyLimitSettings
+from app.config.config import BatchSettings
+from app.config.config import HealthCheckSettings
+from app.config.config import LocalCacheSettings
+from app.config.config import CacheSettings
+from app.config.config import JWTSettings
+from app.config.config import RevocationFilterSettings
+from app.repositories.client_side_cache import ClientSideCache
 from app.repositories.redis_repository import RedisRepository
+from app.services.config_reloader import ConfigReloader
+from app.services.jwt_verifier import JWTVerifier
+from app.services.revocation_filter import RevocationFilter
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.local_cache import CacheInvalidationListener, LocalCache
+from app.utils.single_flight import SingleFlight
 
 
 class Container(containers.DeclarativeContainer):
     wiring_config = containers.WiringConfiguration(
         modules=[
             "app.endpoints.gateway",
+            "app.endpoints.batch",
             "app.endpoints.users",
             "app.utils.cache",
             "app.middleware.jwt_auth_middleware",
+            "app.middleware.metrics_middleware",
         ]
     )
 
@@ -24,14 +44,183 @@ class Container(containers.DeclarativeContainer):
     config.redis.db.from_env("REDIS_DB")
     config.redis.password.from_env("REDIS_PASSWORD")
     config.redis.default_ttl.from_env("REDIS_DEFAULT_TTL")
+    config.redis.socket_timeout.from_env("REDIS_SOCKET_TIMEOUT", default=0.25)
+    config.redis.max_connections.from_env("REDIS_MAX_CONNECTIONS", default=50)
+    config.redis.pool_timeout.from_env("REDIS_POOL_TIMEOUT", default=1.0)
+    config.redis.auto_pipeline.from_env("REDIS_AUTO_PIPELINE", default=True)
+
+    config.client_cache.enabled.from_env("REDIS_CLIENT_CACHE_ENABLED", default=True)
+    config.client_cache.prefixes.from_env(
+        "REDIS_CLIENT_CACHE_PREFIXES", default="jwt:,black_list_jwt:"
+    )
+    config.client_cache.max_bytes.from_env(
+        "REDIS_CLIENT_CACHE_MAX_BYTES", default=16 * 1024 * 1024
+    )
+    config.client_cache.max_entries.from_env(
+        "REDIS_CLIENT_CACHE_MAX_ENTRIES", default=50_000
+    )
+    config.client_cache.ttl.from_env("REDIS_CLIENT_CACHE_TTL", default=60.0)
+
+    config.http.max_connections.from_env("UPSTREAM_MAX_CONNECTIONS", default=100)
+    config.http.max_keepalive_connections.from_env(
+        "UPSTREAM_MAX_KEEPALIVE_CONNECTIONS", default=20
+    )
+    config.http.keepalive_expiry.from_env("UPSTREAM_KEEPALIVE_EXPIRY", default=30.0)
+    config.http.timeout.from_env("UPSTREAM_TIMEOUT", default=10.0)
+    config.http.connect_timeout.from_env("UPSTREAM_CONNECT_TIMEOUT", default=2.0)
+    config.http.http2.from_env("UPSTREAM_HTTP2", default=False)
+    config.http.stream_responses.from_env("UPSTREAM_STREAM_RESPONSES", default=False)
+    config.http.max_retries.from_env("UPSTREAM_MAX_RETRIES", default=2)
+    config.http.retry_budget_ratio.from_env("UPSTREAM_RETRY_BUDGET_RATIO", default=0.1)
+    config.http.retry_budget_min.from_env("UPSTREAM_RETRY_BUDGET_MIN", default=10)
+    config.http.breaker_failure_threshold.from_env(
+        "UPSTREAM_BREAKER_FAILURE_THRESHOLD", default=5
+    )
+    config.http.breaker_reset_timeout.from_env(
+        "UPSTREAM_BREAKER_RESET_TIMEOUT", default=10.0
+    )
+    config.http.hedge_percentile.from_env("UPSTREAM_HEDGE_PERCENTILE", default=0.0)
+
+    config.concurrency.initial_limit.from_env("CONCURRENCY_LIMIT_INITIAL", default=20)
+    config.concurrency.min_limit.from_env("CONCURRENCY_LIMIT_MIN", default=2)
+    config.concurrency.max_limit.from_env("CONCURRENCY_LIMIT_MAX", default=200)
+    config.concurrency.queue_size.from_env("CONCURRENCY_LIMIT_QUEUE_SIZE", default=50)
+    config.concurrency.queue_timeout.from_env(
+        "CONCURRENCY_LIMIT_QUEUE_TIMEOUT", default=0.5
+    )
+    config.concurrency.latency_tolerance.from_env(
+        "CONCURRENCY_LIMIT_LATENCY_TOLERANCE", default=2.0
+    )
+    config.concurrency.auth_max_limit.from_env("CONCURRENCY_LIMIT_AUTH_MAX", default=50)
+    config.concurrency.public_max_limit.from_env(
+        "CONCURRENCY_LIMIT_PUBLIC_MAX", default=50
+    )
+    config.concurrency.retry_after.from_env("CONCURRENCY_LIMIT_RETRY_AFTER", default=1)
+
+    config.config_reload.interval.from_env("CONFIG_RELOAD_INTERVAL", default=2.0)
+
+    config.batch.max_requests.from_env("BATCH_MAX_REQUESTS", default=20)
+    config.batch.item_timeout.from_env("BATCH_ITEM_TIMEOUT", default=5.0)
+
+    config.local_cache.max_bytes.from_env(
+        "LOCAL_CACHE_MAX_BYTES", default=64 * 1024 * 1024
+    )
+    config.local_cache.max_entries.from_env("LOCAL_CACHE_MAX_ENTRIES", default=10_000)
+    config.local_cache.ttl.from_env("LOCAL_CACHE_TTL", default=5.0)
+
+    config.cache.breaker_failure_threshold.from_env(
+        "CACHE_BREAKER_FAILURE_THRESHOLD", default=3
+    )
+    config.cache.breaker_reset_timeout.from_env(
+        "CACHE_BREAKER_RESET_TIMEOUT", default=5.0
+    )
+    config.cache.lock_timeout.from_env("CACHE_LOCK_TIMEOUT", default=0.0)
+    config.cache.lock_poll_interval.from_env("CACHE_LOCK_POLL_INTERVAL", default=0.05)
+    config.cache.stale_ttl.from_env("CACHE_STALE_TTL", default=0)
+    config.cache.compression_level.from_env("CACHE_COMPRESSION_LEVEL", default=6)
+
+    config.jwt.key.from_env("SECRET_KEY", default="")
+    config.jwt.algorithm.from_env("ALGORITHM", default="HS256")
+    config.jwt.jwks_path.from_env("JWT_JWKS_PATH", default="jwks")
+    config.jwt.jwks_refresh_interval.from_env(
+        "JWT_JWKS_REFRESH_INTERVAL", default=30.0
+    )
+
+    config.revocation.capacity.from_env("REVOCATION_FILTER_CAPACITY", default=100_000)
+    config.revocation.error_rate.from_env(
+        "REVOCATION_FILTER_ERROR_RATE", default=0.01
+    )
+    config.revocation.sync_interval.from_env(
+        "REVOCATION_FILTER_SYNC_INTERVAL", default=30.0
+    )
+
+    config.health_check.interval.from_env(
+        "UPSTREAM_HEALTH_CHECK_INTERVAL", default=5.0
+    )
+    config.health_check.timeout.from_env("UPSTREAM_HEALTH_CHECK_TIMEOUT", default=1.0)
+    config.health_check.unhealthy_threshold.from_env(
+        "UPSTREAM_UNHEALTHY_THRESHOLD", default=2
+    )
+    config.health_check.unhealthy_cooldown.from_env(
+        "UPSTREAM_UNHEALTHY_COOLDOWN", default=10.0
+    )
+    config.health_check.balancer.from_env("UPSTREAM_BALANCER", default="p2c")
 
     services_config = providers.Singleton(
         ServicesConfig.from_json_file,
         "config.json",
     )
 
-    reroute_client = providers.Factory(
-        RerouteRequestToServiceClient, config=services_config
+    config_reload_settings = providers.Singleton(
+        ConfigReloadSettings,
+        interval=config.config_reload.interval,
+    )
+
+    http_client_settings = providers.Singleton(
+        HttpClientSettings,
+        max_connections=config.http.max_connections,
+        max_keepalive_connections=config.http.max_keepalive_connections,
+        keepalive_expiry=config.http.keepalive_expiry,
+        timeout=config.http.timeout,
+        connect_timeout=config.http.connect_timeout,
+        http2=config.http.http2,
+        stream_responses=config.http.stream_responses,
+        max_retries=config.http.max_retries,
+        retry_budget_ratio=config.http.retry_budget_ratio,
+        retry_budget_min=config.http.retry_budget_min,
+        breaker_failure_threshold=config.http.breaker_failure_threshold,
+        breaker_reset_timeout=config.http.breaker_reset_timeout,
+        hedge_percentile=config.http.hedge_percentile,
+    )
+
+    concurrency_limit_settings = providers.Singleton(
+        ConcurrencyLimitSettings,
+        initial_limit=config.concurrency.initial_limit,
+        min_limit=config.concurrency.min_limit,
+        max_limit=config.concurrency.max_limit,
+        queue_size=config.concurrency.queue_size,
+        queue_timeout=config.concurrency.queue_timeout,
+        latency_tolerance=config.concurrency.latency_tolerance,
+        auth_max_limit=config.concurrency.auth_max_limit,
+        public_max_limit=config.concurrency.public_max_limit,
+        retry_after=config.concurrency.retry_after,
+    )
+
+    batch_settings = providers.Singleton(
+        BatchSettings,
+        max_requests=config.batch.max_requests,
+        item_timeout=config.batch.item_timeout,
+    )
+
+    health_check_settings = providers.Singleton(
+        HealthCheckSettings,
+        interval=config.health_check.interval,
+        timeout=config.health_check.timeout,
+        unhealthy_threshold=config.health_check.unhealthy_threshold,
+        unhealthy_cooldown=config.health_check.unhealthy_cooldown,
+        balancer=config.health_check.balancer,
+    )
+
+    upstream_registry = providers.Singleton(
+        UpstreamRegistry,
+        config=services_config,
+        settings=health_check_settings,
+    )
+
+    reroute_client = providers.Singleton(
+        RerouteRequestToServiceClient,
+        config=services_config,
+        http_settings=http_client_settings,
+        limit_settings=concurrency_limit_settings,
+        registry=upstream_registry,
+    )
+
+    config_reloader = providers.Singleton(
+        ConfigReloader,
+        services_config=services_config,
+        settings=config_reload_settings,
+        reroute_client=reroute_client,
+        registry=upstream_registry,
     )
 
     redis_settings = providers.Factory(
@@ -41,9 +230,104 @@ class Container(containers.DeclarativeContainer):
         db=config.redis.db,
         password=config.redis.password,
         default_ttl=config.redis.default_ttl,
+        socket_timeout=config.redis.socket_timeout,
+        max_connections=config.redis.max_connections,
+        pool_timeout=config.redis.pool_timeout,
+        auto_pipeline=config.redis.auto_pipeline,
     )
 
-    redis_repository = providers.Factory(
+    client_cache_settings = providers.Singleton(
+        ClientSideCacheSettings,
+        enabled=config.client_cache.enabled,
+        prefixes=config.client_cache.prefixes,
+        max_bytes=config.client_cache.max_bytes,
+        max_entries=config.client_cache.max_entries,
+        ttl=config.client_cache.ttl,
+    )
+
+    client_side_cache = providers.Singleton(
+        ClientSideCache,
+        redis_url=redis_settings.provided.url,
+        enabled=client_cache_settings.provided.enabled,
+        prefixes=client_cache_settings.provided.prefix_list,
+        max_bytes=client_cache_settings.provided.max_bytes,
+        max_entries=client_cache_settings.provided.max_entries,
+        ttl=client_cache_settings.provided.ttl,
+    )
+
+    # One client per process, so that concurrent requests share connections
+    # and their commands are pipelined together.
+    redis_repository = providers.Singleton(
         RedisRepository,
         redis_url=redis_settings.provided.url,
+        socket_timeout=redis_settings.provided.socket_timeout,
+        max_connections=redis_settings.provided.max_connections,
+        pool_timeout=redis_settings.provided.pool_timeout,
+        auto_pipeline=redis_settings.provided.auto_pipeline,
+        client_cache=client_side_cache,
+    )
+
+    cache_settings = providers.Singleton(
+        CacheSettings,
+        breaker_failure_threshold=config.cache.breaker_failure_threshold,
+        breaker_reset_timeout=config.cache.breaker_reset_timeout,
+        lock_timeout=config.cache.lock_timeout,
+        lock_poll_interval=config.cache.lock_poll_interval,
+        stale_ttl=config.cache.stale_ttl,
+        compression_level=config.cache.compression_level,
+    )
+
+    cache_breaker = providers.Singleton(
+        CircuitBreaker,
+        failure_threshold=cache_settings.provided.breaker_failure_threshold,
+        reset_timeout=cache_settings.provided.breaker_reset_timeout,
+    )
+
+    local_cache_settings = providers.Singleton(
+        LocalCacheSettings,
+        max_bytes=config.local_cache.max_bytes,
+        max_entries=config.local_cache.max_entries,
+        ttl=config.local_cache.ttl,
+    )
+
+    local_cache = providers.Singleton(
+        LocalCache,
+        max_bytes=local_cache_settings.provided.max_bytes,
+        max_entries=local_cache_settings.provided.max_entries,
+        ttl=local_cache_settings.provided.ttl,
+    )
+
+    cache_invalidation_listener = providers.Singleton(
+        CacheInvalidationListener,
+        local_cache=local_cache,
+        redis_repository=redis_repository,
+    )
+
+    single_flight = providers.Singleton(SingleFlight)
+
+    jwt_settings = providers.Singleton(
+        JWTSettings,
+        key=config.jwt.key,
+        algorithm=config.jwt.algorithm,
+        jwks_path=config.jwt.jwks_path,
+        jwks_refresh_interval=config.jwt.jwks_refresh_interval,
+    )
+
+    jwt_verifier = providers.Singleton(
+        JWTVerifier,
+        jwt_settings=jwt_settings,
+        reroute_client=reroute_client,
+    )
+
+    revocation_filter_settings = providers.Singleton(
+        RevocationFilterSettings,
+        capacity=config.revocation.capacity,
+        error_rate=config.revocation.error_rate,
+        sync_interval=config.revocation.sync_interval,
+    )
+
+    revocation_filter = providers.Singleton(
+        RevocationFilter,
+        settings=revocation_filter_settings,
+        redis_repository=redis_repository,
     )
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+from typing import Annotated
+from urllib.parse import quote, urlencode
+
+from dependency_injector.wiring import inject, Provide
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import Response
+
+from app.clients.reroute_request_client import RerouteRequestToServiceClient
+from app.config.config import BatchSettings, ServicesConfig
+from app.containers.container import Container
+from app.models.batch import BatchItem, BatchItemResponse, BatchRequest, BatchResponse
+from app.utils import json_codec
+from app.repositories.redis_repository import RedisRepository
+from app.utils.cache import get_redis_cache, invalidate_after_write
+
+logger = logging.getLogger(__name__)
+
+batch_router = APIRouter()
+
+# Sub-requests get plain bodies that are embedded into the combined response.
+DROPPED_HEADERS = {
+    b"accept-encoding",
+    b"content-length",
+    b"content-type",
+    b"if-none-match",
+    b"transfer-encoding",
+}
+
+FORWARDED_RESPONSE_HEADERS = ("content-type", "etag", "retry-after")
+
+
+@get_redis_cache(hash_name="gateway", expiration_time=30)
+@inject
+async def _fetch(
+    request: Request,
+    service_name: str,
+    path: str,
+    reroute_client: Annotated[
+        RerouteRequestToServiceClient, Depends(Provide[Container.reroute_client])
+    ] = None,
+    services_config: Annotated[
+        ServicesConfig, Depends(Provide[Container.services_config])
+    ] = None,
+    redis_repository: Annotated[
+        RedisRepository, Depends(Provide[Container.redis_repository])
+    ] = None,
+):
+    response = await reroute_client.reroute_request(
+        request=request, service_name=service_name, path=path, stream=False
+    )
+    if request.method != "GET":
+        # Writes drop cached entries the same way as on the direct route.
+        invalidate_after_write(
+            services_config,
+            redis_repository,
+            request,
+            response,
+            hash_name="gateway",
+            service_name=service_name,
+            path=path,
+        )
+    return response
+
+
+def _sub_request(parent: Request, item: BatchItem) -> Request:
+    """Build a request for one item, carrying the caller's credentials."""
+    body = b""
+    headers = [
+        (name, value)
+        for name, value in parent.scope["headers"]
+        if name not in DROPPED_HEADERS
+    ]
+    if item.body is not None:
+        body = json_codec.dumps(item.body)
+        headers.append((b"content-type", b"application/json"))
+        headers.append((b"content-length", str(len(body)).encode()))
+
+    path = f"/{item.service}/{item.path.lstrip('/')}"
+    scope = {
+        **parent.scope,
+        "method": item.method,
+        "path": path,
+        "raw_path": quote(path).encode(),
+        "query_string": urlencode(item.query, doseq=True).encode(),
+        "headers": headers,
+        "state": {},
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return Request(scope, receive)
+
+
+def _item_response(item: BatchItem, response: Response) -> BatchItemResponse:
+    content_type = response.headers.get("content-type", "")
+    body = response.body.decode("utf-8", errors="replace")
+    if "json" in content_type:
+        try:
+            body = json_codec.loads(response.body)
+        except json_codec.JSONDecodeError:
+            pass
+    return BatchItemResponse(
+        id=item.id,
+        status=response.status_code,
+        headers={
+            name: response.headers[name]
+            for name in FORWARDED_RESPONSE_HEADERS
+            if name in response.headers
+        },
+        body=body if response.body else None,
+    )
+
+
+async def _run_item(
+    request: Request, item: BatchItem, max_timeout: float
+) -> BatchItemResponse:
+    timeout = min(item.timeout or max_timeout, max_timeout)
+    try:
+        response = await asyncio.wait_for(
+            _fetch(
+                request=_sub_request(request, item),
+                service_name=item.service,
+                path=item.path.lstrip("/"),
+            ),
+            timeout,
+        )
+        return _item_response(item, response)
+    except asyncio.TimeoutError:
+        return BatchItemResponse(
+            id=item.id, status=504, body={"detail": "Gateway timeout"}
+        )
+    except HTTPException as e:
+        return BatchItemResponse(
+            id=item.id,
+            status=e.status_code,
+            headers=e.headers or {},
+            body={"detail": e.detail},
+        )
+    except Exception:
+        logger.exception("Batch item failed service=%s", item.service)
+        return BatchItemResponse(
+            id=item.id, status=500, body={"detail": "Internal server error"}
+        )
+
+
+@batch_router.post("/batch", response_model=BatchResponse)
+@inject
+async def batch(
+    request: Request,
+    batch_request: BatchRequest,
+    batch_settings: Annotated[
+        BatchSettings, Depends(Provide[Container.batch_settings])
+    ],
+):
+    """Run several gateway requests concurrently and return all responses.
+
+    The caller is authenticated once for the whole batch. Every item goes
+    through the same cache, limits and upstream client as a direct request,
+    has its own timeout and gets its own status in the combined response.
+    """
+    if len(batch_request.requests) > batch_settings.max_requests:
+        raise HTTPException(
+            status_code=413,
+            detail=f"A batch holds at most {batch_settings.max_requests} requests",
+        )
+    responses = await asyncio.gather(
+        *(
+            _run_item(request, item, batch_settings.item_timeout)
+            for item in batch_request.requests
+        )
+    )
+    return BatchResponse(responses=responses)
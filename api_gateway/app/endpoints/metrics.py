@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from app.utils.metrics import render
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics")
+async def metrics():
+    content, content_type = render()
+    return Response(content=content, media_type=content_type)
@@ -9,7 +9,10 @@ from app.clients.reroute_request_client import (
 
 from fastapi import Request
 
+from app.config.config import ServicesConfig
 from app.containers.container import Container
+from app.repositories.redis_repository import RedisRepository
+from app.utils.cache import invalidate_after_write
 
 user_router = APIRouter()
 
@@ -23,7 +26,24 @@ async def logout(
     reroute_client: Annotated[
         RerouteRequestToServiceClient, Depends(Provide[Container.reroute_client])
     ],
+    services_config: Annotated[
+        ServicesConfig, Depends(Provide[Container.services_config])
+    ],
+    redis_repository: Annotated[
+        RedisRepository, Depends(Provide[Container.redis_repository])
+    ],
 ):
-    return await reroute_client.reroute_request(
+    response = await reroute_client.reroute_request(
         request=request, service_name=service_name, path=path
     )
+    # Only routes with ``invalidates`` in their cache policy drop entries.
+    invalidate_after_write(
+        services_config,
+        redis_repository,
+        request,
+        response,
+        hash_name="gateway",
+        service_name=service_name,
+        path=path,
+    )
+    return response
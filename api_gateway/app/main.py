@@ -1,17 +1,63 @@
+import logging
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
 from app.containers.container import Container
+from app.endpoints.batch import batch_router
 from app.endpoints.gateway import gateway_router
+from app.endpoints.metrics import metrics_router
 from app.endpoints.users import user_router
 from app.middleware.jwt_auth_middleware import jwt_auth_middleware
+from app.middleware.metrics_middleware import metrics_middleware
+from app.utils.responses import JSONResponse
+
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s level=%(levelname)s logger=%(name)s %(message)s",
+)
+# httpx logs every request at INFO, which is far too chatty for a proxy.
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    redis_repository = app.container.redis_repository()
+    client_side_cache = app.container.client_side_cache()
+    config_reloader = app.container.config_reloader()
+    upstream_registry = app.container.upstream_registry()
+    reroute_client = app.container.reroute_client()
+    cache_invalidation_listener = app.container.cache_invalidation_listener()
+    revocation_filter = app.container.revocation_filter()
+    jwt_verifier = app.container.jwt_verifier()
+    await client_side_cache.start()
+    await config_reloader.start()
+    await upstream_registry.start()
+    await reroute_client.start()
+    await jwt_verifier.start()
+    await cache_invalidation_listener.start()
+    await revocation_filter.start()
+    yield
+    await revocation_filter.stop()
+    await cache_invalidation_listener.stop()
+    await reroute_client.aclose()
+    await upstream_registry.stop()
+    await config_reloader.stop()
+    await client_side_cache.stop()
+    await redis_repository.close()
 
 
 def create_app() -> FastAPI:
     container = Container()
     container.init_resources()
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan, default_response_class=JSONResponse)
     app.container = container
     app.middleware("http")(jwt_auth_middleware)
+    # Added last so that it wraps authentication as well.
+    app.middleware("http")(metrics_middleware)
+    app.include_router(metrics_router)
+    app.include_router(batch_router)
     app.include_router(user_router)
     app.include_router(gateway_router)
     return app
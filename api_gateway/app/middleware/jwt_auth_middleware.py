@@ -1,12 +1,24 @@
 from typing import Annotated, Optional
 import hashlib
+import logging
+import time
 from dependency_injector.wiring import inject, Provide
 from fastapi import Request, HTTPException, Depends
 from starlette import status
-from starlette.responses import JSONResponse
-from app.clients.reroute_request_client import RerouteRequestToServiceClient
+from app.clients.reroute_request_client import (
+    AUTH_LIMIT_GROUP,
+    PUBLIC_LIMIT_GROUP,
+    RerouteRequestToServiceClient,
+)
+from app.config.config import ServicesConfig
 from app.containers.container import Container
 from app.repositories.redis_repository import RedisRepository
+from app.services.jwt_verifier import JWTVerifier, UnknownKeyError
+from app.services.revocation_filter import RevocationFilter
+from app.utils.metrics import AUTH_DURATION
+from app.utils.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
 
 
 EXCLUDE_PATHS = {
@@ -14,10 +26,23 @@ EXCLUDE_PATHS = {
     "/docs",
     "/redoc",
     "/openapi.json",
+    "/metrics",
     "/users_service/login",
     "/users_service/registration",
 }
 
+AUTH_PATHS = {
+    "/users_service/login",
+    "/users_service/registration",
+}
+
+
+def is_public_path(services_config: ServicesConfig, path: str) -> bool:
+    """Check the path against the public endpoints of its service."""
+    service_name, _, service_path = path.lstrip("/").partition("/")
+    service_config = services_config.get_service_config(service_name)
+    return service_config is not None and service_config.is_public(service_path)
+
 
 def get_jwt_fingerprint(token: str) -> str:
     """Generate SHA-256 fingerprint for JWT token."""
@@ -43,27 +68,40 @@ async def verify_token_with_service(
         service_name="users_service",
         path="verify_token",
         method="POST",
+        stream=False,
+        limit_group=AUTH_LIMIT_GROUP,
     )
     return response.status_code == status.HTTP_200_OK
 
 
-async def check_token_blacklist(redis_repository: RedisRepository, token: str) -> bool:
-    cache_key = f"black_list_jwt:{get_jwt_fingerprint(token)}"
-    return await redis_repository.get(cache_key)
-
-
-async def cache_token(redis_repo: RedisRepository, token: str, ttl: int = 60) -> None:
+async def lookup_token(
+    redis_repository: RedisRepository,
+    fingerprint: str,
+    check_blacklist: bool,
+    check_cache: bool,
+) -> tuple[bool, bool]:
+    """Return (blacklisted, cached) for the token in one MGET."""
+    keys = []
+    if check_blacklist:
+        keys.append(f"black_list_jwt:{fingerprint}")
+    if check_cache:
+        keys.append(f"jwt:{fingerprint}")
+    if not keys:
+        return False, False
+    values = iter(await redis_repository.mget(keys))
+    blacklisted = check_blacklist and next(values) is not None
+    cached = check_cache and next(values) is not None
+    return blacklisted, cached
+
+
+async def cache_token(
+    redis_repo: RedisRepository, fingerprint: str, token: str, ttl: int = 60
+) -> None:
     """Cache token in Redis with specified TTL."""
-    cache_key = f"jwt:{get_jwt_fingerprint(token)}"
+    cache_key = f"jwt:{fingerprint}"
     await redis_repo.set(key=cache_key, value=token, ttl=ttl)
 
 
-async def is_token_cached(redis_repo: RedisRepository, token: str) -> bool:
-    """Check if token exists in cache."""
-    cache_key = f"jwt:{get_jwt_fingerprint(token)}"
-    return await redis_repo.get(cache_key) is not None
-
-
 @inject
 async def jwt_auth_middleware(
     request: Request,
@@ -74,36 +112,91 @@ async def jwt_auth_middleware(
     redis_repository: Annotated[
         RedisRepository, Depends(Provide[Container.redis_repository])
     ] = None,
+    jwt_verifier: Annotated[JWTVerifier, Depends(Provide[Container.jwt_verifier])] = None,
+    revocation_filter: Annotated[
+        RevocationFilter, Depends(Provide[Container.revocation_filter])
+    ] = None,
+    services_config: Annotated[
+        ServicesConfig, Depends(Provide[Container.services_config])
+    ] = None,
 ) -> JSONResponse:
     """JWT authentication middleware with Redis caching."""
-    if request.url.path in EXCLUDE_PATHS:
+    # Login and registration, and the public endpoints, get their own
+    # upstream concurrency limits, so a flood of API calls can't starve them
+    # and the other way round.
+    public = is_public_path(services_config, request.url.path)
+    if request.url.path in AUTH_PATHS:
+        request.state.limit_group = AUTH_LIMIT_GROUP
+    elif public:
+        request.state.limit_group = PUBLIC_LIMIT_GROUP
+    if request.url.path in EXCLUDE_PATHS or public:
         return await call_next(request)
 
+    started = time.perf_counter()
+    method = "local" if jwt_verifier.enabled else "remote"
+    outcome = "error"
     try:
         token = extract_bearer_token(request.headers.get("Authorization"))
-
-        blacklist = await check_token_blacklist(redis_repository, token)
+        fingerprint = get_jwt_fingerprint(token)
+
+        # The local filter rules out most tokens, only possible hits are
+        # confirmed against the blacklist in Redis.
+        blacklist, cached = await lookup_token(
+            redis_repository,
+            fingerprint,
+            check_blacklist=revocation_filter.might_be_revoked(fingerprint),
+            check_cache=not jwt_verifier.enabled,
+        )
         if blacklist:
+            outcome = "revoked"
             return JSONResponse(
                 content={"message": "blacklisted or expired token"},
                 status_code=status.HTTP_401_UNAUTHORIZED,
             )
 
-        if await is_token_cached(redis_repository, token):
-            return await call_next(request)
-
-        if not await verify_token_with_service(reroute_client, request, token):
-            return JSONResponse(
-                content={"message": "Invalid or expired token"},
-                status_code=status.HTTP_401_UNAUTHORIZED,
-            )
-
-        await cache_token(redis_repository, token)
-        return await call_next(request)
-
-    except Exception as e:
-        print("!!!!!", e)
+        # Signature and expiry are checked locally, users_service is only
+        # consulted for revocation through the blacklist it writes to Redis.
+        if jwt_verifier.enabled:
+            try:
+                valid = await jwt_verifier.verify(token) is not None
+            except UnknownKeyError:
+                # Signed with a key that isn't in the key set yet, e.g. right
+                # after a rotation, users_service can still check it.
+                method = "remote"
+                valid = await verify_token_with_service(reroute_client, request, token)
+            if not valid:
+                outcome = "rejected"
+                return JSONResponse(
+                    content={"message": "Invalid or expired token"},
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                )
+            outcome = "ok"
+        elif cached:
+            method, outcome = "cached", "ok"
+        else:
+            if not await verify_token_with_service(reroute_client, request, token):
+                outcome = "rejected"
+                return JSONResponse(
+                    content={"message": "Invalid or expired token"},
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                )
+            await cache_token(redis_repository, fingerprint, token)
+            outcome = "ok"
+
+    except HTTPException as e:
+        outcome = "rejected" if e.status_code == 401 else "error"
+        return JSONResponse(
+            content={"message": e.detail},
+            status_code=e.status_code,
+            headers=e.headers,
+        )
+    except Exception:
+        logger.exception("Authentication failed")
         return JSONResponse(
             content={"message": "Authentication failed"},
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         )
+    finally:
+        AUTH_DURATION.labels(method, outcome).observe(time.perf_counter() - started)
+
+    return await call_next(request)
@@ -0,0 +1,44 @@
+import time
+from typing import Annotated
+
+from dependency_injector.wiring import inject, Provide
+from fastapi import Request, Depends
+from starlette.responses import Response
+
+from app.config.config import ServicesConfig
+from app.containers.container import Container
+from app.utils.metrics import REQUEST_DURATION, REQUESTS_IN_FLIGHT, route_label
+
+METRICS_PATH = "/metrics"
+
+
+@inject
+async def metrics_middleware(
+    request: Request,
+    call_next,
+    services_config: Annotated[
+        ServicesConfig, Depends(Provide[Container.services_config])
+    ] = None,
+) -> Response:
+    """Record request latency per service and route and the in-flight gauge."""
+    if request.url.path == METRICS_PATH:
+        return await call_next(request)
+
+    # Unknown services are collapsed so that random paths can't blow up the
+    # number of series.
+    service, _, path = request.url.path.lstrip("/").partition("/")
+    if services_config.get_service_config(service) is None:
+        service, path = "other", ""
+    in_flight = REQUESTS_IN_FLIGHT.labels(service)
+    in_flight.inc()
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        in_flight.dec()
+        REQUEST_DURATION.labels(
+            service, route_label(path), request.method, str(status_code)
+        ).observe(time.perf_counter() - started)
@@ -0,0 +1,28 @@
+from typing import Any, Literal
+
+from pydantic import BaseModel, Field
+
+
+class BatchItem(BaseModel):
+    id: str | None = None
+    service: str
+    path: str
+    method: Literal["GET", "POST"] = "GET"
+    query: dict[str, str | list[str]] = Field(default_factory=dict)
+    body: Any = None
+    timeout: float | None = Field(default=None, gt=0)
+
+
+class BatchRequest(BaseModel):
+    requests: list[BatchItem] = Field(min_length=1)
+
+
+class BatchItemResponse(BaseModel):
+    id: str | None = None
+    status: int
+    headers: dict[str, str] = Field(default_factory=dict)
+    body: Any = None
+
+
+class BatchResponse(BaseModel):
+    responses: list[BatchItemResponse]
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from redis.asyncio import ConnectionPool
+from redis.exceptions import ResponseError
+
+from app.utils.local_cache import LocalCache
+from app.utils.metrics import CLIENT_CACHE_BYTES, CLIENT_CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "__redis__:invalidate"
+
+RECONNECT_DELAY = 1.0
+
+# Rough size of the key, the tuple and the dict slot of an entry.
+ENTRY_OVERHEAD = 100
+
+
+class ClientSideCache:
+    """Serves hot Redis keys from process memory (Redis 6+ client-side caching).
+
+    A dedicated connection enables ``CLIENT TRACKING`` in broadcasting mode
+    for the configured key prefixes and subscribes itself to the
+    invalidation channel. Redis then reports every write, expiry and
+    eviction of a matching key, including keys that did not exist when they
+    were read, so missing keys are cached as well. While the connection is
+    down the cache is empty and reads go to Redis.
+    """
+
+    def __init__(
+        self,
+        redis_url: str,
+        enabled: bool,
+        prefixes: list[str],
+        max_bytes: int,
+        max_entries: int,
+        ttl: float,
+    ):
+        self.redis_url = redis_url
+        self.enabled = enabled
+        self.prefixes = tuple(prefixes)
+        # Entries also expire after ``ttl`` so that a connection that died
+        # without being noticed can't keep stale values around for long.
+        self.__cache = LocalCache(max_bytes=max_bytes, max_entries=max_entries, ttl=ttl)
+        # Keys being read from Redis, an invalidation drops the marker so
+        # that a value read before the write isn't cached after it.
+        self.__pending: dict[str, object] = {}
+        self.__ready = False
+        self.__hits = 0
+        self.__misses = 0
+        self.__task: asyncio.Task | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self.__ready
+
+    async def start(self) -> None:
+        if self.enabled and self.prefixes:
+            self.__task = asyncio.create_task(self.__track())
+
+    async def stop(self) -> None:
+        if self.__task is None:
+            return
+        self.__task.cancel()
+        try:
+            await self.__task
+        except asyncio.CancelledError:
+            pass
+        self.__task = None
+        logger.info("Redis client-side cache stats %s", self.stats())
+
+    def stats(self) -> dict:
+        lookups = self.__hits + self.__misses
+        return {
+            "hits": self.__hits,
+            "misses": self.__misses,
+            "hit_rate": round(self.__hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self.__cache),
+            "bytes": self.__cache.size,
+        }
+
+    async def mget(
+        self,
+        keys: list[str],
+        fetch: Callable[[list[str]], Awaitable[list[str | None]]],
+    ) -> list[str | None]:
+        """Return the values of keys, reading only uncached ones with fetch."""
+        if not self.__ready:
+            return await fetch(keys)
+
+        values: list[str | None] = [None] * len(keys)
+        missing: dict[str, list[int]] = {}
+        markers: dict[str, object] = {}
+        hits = 0
+        for index, key in enumerate(keys):
+            tracked = key.startswith(self.prefixes)
+            entry = self.__cache.get(key) if tracked else None
+            if entry is not None:
+                values[index] = entry[0]
+                hits += 1
+                continue
+            missing.setdefault(key, []).append(index)
+            if tracked and key not in markers:
+                markers[key] = self.__pending.setdefault(key, object())
+        self.__record(hits, len(markers))
+        if not missing:
+            return values
+
+        try:
+            fetched = await fetch(list(missing))
+        except BaseException:
+            for key, marker in markers.items():
+                if self.__pending.get(key) is marker:
+                    del self.__pending[key]
+            raise
+
+        for (key, indexes), value in zip(missing.items(), fetched):
+            for index in indexes:
+                values[index] = value
+            marker = markers.get(key)
+            if marker is not None and self.__pending.get(key) is marker:
+                del self.__pending[key]
+                size = len(key) + len(value or "") + ENTRY_OVERHEAD
+                self.__cache.set(key, (value,), size)
+        CLIENT_CACHE_BYTES.set(self.__cache.size)
+        return values
+
+    def __record(self, hits: int, misses: int) -> None:
+        self.__hits += hits
+        self.__misses += misses
+        if hits:
+            CLIENT_CACHE_REQUESTS.labels("hit").inc(hits)
+        if misses:
+            CLIENT_CACHE_REQUESTS.labels("miss").inc(misses)
+
+    def __invalidate(self, keys: list[bytes] | None) -> None:
+        if keys is None:
+            # FLUSHDB, FLUSHALL or the server ran out of tracking memory.
+            self.__flush()
+            return
+        for key in keys:
+            key = key.decode("utf-8")
+            self.__cache.invalidate(key)
+            self.__pending.pop(key, None)
+        CLIENT_CACHE_BYTES.set(self.__cache.size)
+
+    def __flush(self) -> None:
+        self.__cache.clear()
+        self.__pending.clear()
+        CLIENT_CACHE_BYTES.set(0)
+
+    async def __track(self) -> None:
+        pool = ConnectionPool.from_url(
+            self.redis_url, protocol=2, socket_keepalive=True
+        )
+        while True:
+            connection = pool.make_connection()
+            try:
+                await connection.connect()
+                await connection.send_command("CLIENT", "ID")
+                client_id = await connection.read_response()
+                # The connection redirects invalidations to itself, they
+                # arrive as pub/sub messages.
+                prefixes = [arg for prefix in self.prefixes for arg in ("PREFIX", prefix)]
+                await connection.send_command(
+                    "CLIENT", "TRACKING", "ON", "REDIRECT", client_id, "BCAST", *prefixes
+                )
+                await connection.read_response()
+                await connection.send_command("SUBSCRIBE", INVALIDATION_CHANNEL)
+                await connection.read_response()
+
+                self.__ready = True
+                logger.info(
+                    "Redis client-side caching enabled prefixes=%s",
+                    ",".join(self.prefixes),
+                )
+                while True:
+                    message = await connection.read_response(timeout=None)
+                    if message[0] == b"message":
+                        self.__invalidate(message[2])
+            except asyncio.CancelledError:
+                raise
+            except ResponseError as e:
+                logger.warning(
+                    "Redis client-side caching is not supported by the server error=%s",
+                    e,
+                )
+                return
+            except Exception as e:
+                logger.warning("Redis client-side caching interrupted error=%s", e)
+            finally:
+                self.__ready = False
+                self.__flush()
+                await connection.disconnect()
+            await asyncio.sleep(RECONNECT_DELAY)
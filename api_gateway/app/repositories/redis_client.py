@@ -0,0 +1,102 @@
+import asyncio
+import logging
+
+from redis.asyncio import BlockingConnectionPool, Redis
+
+from app.utils.metrics import (
+    REDIS_PIPELINE_COMMANDS,
+    REDIS_POOL_IN_USE,
+    REDIS_POOL_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AutoPipelineRedis(Redis):
+    """Redis client that sends the commands of one event loop tick together.
+
+    Commands are queued instead of being sent right away, and the queue is
+    flushed as a single non-transactional pipeline on the next loop
+    iteration. Concurrent requests then share round trips and connections.
+    Each command still gets its own result or error. Explicit pipelines,
+    pub/sub and scan iterators work as usual.
+
+    Batch sizes and batches in flight, each holding one connection while it
+    runs, are exported as metrics.
+    """
+
+    def __init__(self, *args, max_batch_size: int = 512, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_batch_size = max_batch_size
+        self.__queue: list[tuple[tuple, dict, asyncio.Future]] = []
+        self.__flush_scheduled = False
+        self.__batches: set[asyncio.Task] = set()
+
+    def execute_command(self, *args, **options) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.__queue.append((args, options, future))
+        if len(self.__queue) >= self.max_batch_size:
+            self.__flush()
+        elif not self.__flush_scheduled:
+            self.__flush_scheduled = True
+            loop.call_soon(self.__flush)
+        return future
+
+    def __flush(self) -> None:
+        self.__flush_scheduled = False
+        batch, self.__queue = self.__queue, []
+        if not batch:
+            return
+        task = asyncio.create_task(self.__execute(batch))
+        self.__batches.add(task)
+        task.add_done_callback(self.__batches.discard)
+
+    async def __execute(self, batch: list[tuple[tuple, dict, asyncio.Future]]) -> None:
+        REDIS_PIPELINE_COMMANDS.observe(len(batch))
+        REDIS_POOL_IN_USE.inc()
+        try:
+            async with self.pipeline(transaction=False) as pipe:
+                for args, options, _ in batch:
+                    pipe.execute_command(*args, **options)
+                results = await pipe.execute(raise_on_error=False)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            REDIS_POOL_IN_USE.dec()
+
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+def create_redis_client(
+    redis_url: str,
+    socket_timeout: float | None,
+    max_connections: int,
+    pool_timeout: float,
+    auto_pipeline: bool,
+) -> Redis:
+    """Build the client shared by the whole process.
+
+    The pool holds at most ``max_connections`` connections, callers wait up
+    to ``pool_timeout`` seconds for a free one.
+    """
+    pool = BlockingConnectionPool.from_url(
+        redis_url,
+        max_connections=max_connections,
+        timeout=pool_timeout,
+        socket_timeout=socket_timeout,
+        socket_connect_timeout=socket_timeout,
+    )
+    REDIS_POOL_SIZE.set(max_connections)
+    if auto_pipeline:
+        return AutoPipelineRedis(connection_pool=pool)
+    return Redis(connection_pool=pool)
@@ -1,64 +1,177 @@
-from redis.asyncio import ConnectionPool, Redis
+from redis.asyncio import Redis
 import logging
 
+from app.repositories.redis_client import create_redis_client
+from app.utils.metrics import REDIS_DURATION, observe
+
 logger = logging.getLogger(__name__)
 
+RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
 
 class RedisRepository:
-    def __init__(self, redis_url):
+    def __init__(
+        self,
+        redis_url,
+        socket_timeout=None,
+        max_connections=50,
+        pool_timeout=1.0,
+        auto_pipeline=True,
+        client_cache=None,
+    ):
         self.redis_url = redis_url
-        print(f"Connecting to Redis with URL: {self.redis_url}")
+        self.client_cache = client_cache
+        self.__pubsub_redis = None
+        logger.info("Connecting to Redis url=%s", self.redis_url)
         try:
-            self.redis = Redis(
-                connection_pool=ConnectionPool.from_url(self.redis_url),
-                encoding="utf-8",
+            self.redis = create_redis_client(
+                self.redis_url,
+                socket_timeout=socket_timeout,
+                max_connections=max_connections,
+                pool_timeout=pool_timeout,
+                auto_pipeline=auto_pipeline,
             )
-            print(f"Redis connection created successfully")
-        except Exception as e:
-            print(f"Error creating Redis connection: {e}")
+            logger.info("Redis connection created")
+        except Exception:
+            logger.exception("Error creating Redis connection")
             raise
 
     async def ping(self):
         try:
-            result = await self.redis.ping()
-            print(f"Redis ping result: {result}")
+            with observe(REDIS_DURATION, "ping"):
+                result = await self.redis.ping()
+            logger.debug("Redis PING result=%s", result)
             return result
         except Exception as e:
-            print(f"Redis ping error: {e}")
+            logger.warning("Redis PING error=%s", e)
             return False
 
     async def get(self, key):
         try:
-            data = await self.redis.get(key)
-            print(f"Redis GET: key={key}, data={'found' if data else 'not found'}")
+            with observe(REDIS_DURATION, "get"):
+                data = await self.redis.get(key)
+            logger.debug("Redis GET key=%s found=%s", key, data is not None)
             if data:
-                result = data.decode("utf-8")
-                print(
-                    f"Decoded data: {result[:100]}{'...' if len(result) > 100 else ''}"
-                )
-                return result
+                return data.decode("utf-8")
             return None
         except Exception as e:
-            print(f"Error in Redis GET operation: {e}")
+            logger.warning("Redis GET key=%s error=%s", key, e)
             return None
 
+    async def get_with_ttl(self, key):
+        """Return the raw value and its remaining TTL in seconds in one round trip.
+
+        Errors are raised so that callers can track Redis health.
+        """
+        with observe(REDIS_DURATION, "get_pttl"):
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.get(key)
+                pipe.pttl(key)
+                data, pttl = await pipe.execute()
+        logger.debug("Redis GET key=%s found=%s", key, data is not None)
+        if data:
+            return data, pttl / 1000 if pttl > 0 else None
+        return None, None
+
     async def set(self, key, value, ttl=None):
         try:
             encoded_value = value
             if not isinstance(value, bytes):
                 encoded_value = value.encode("utf-8")
 
-            print(
-                f"Redis SET: key={key}, ttl={ttl}, value_length={len(encoded_value)} bytes"
+            with observe(REDIS_DURATION, "set"):
+                if ttl is not None:
+                    result = await self.redis.setex(key, ttl, encoded_value)
+                else:
+                    result = await self.redis.set(key, encoded_value)
+
+            logger.debug(
+                "Redis SET key=%s ttl=%s bytes=%d result=%s",
+                key,
+                ttl,
+                len(encoded_value),
+                result,
             )
+            return result
+        except Exception as e:
+            logger.warning("Redis SET key=%s error=%s", key, e)
+            return False
+
+    async def mget(self, keys):
+        """Read several keys, tracked keys are served by the client-side cache."""
+        try:
+            if self.client_cache is not None:
+                return await self.client_cache.mget(keys, self.__mget)
+            return await self.__mget(keys)
+        except Exception as e:
+            logger.warning("Redis MGET error=%s", e)
+            return [None] * len(keys)
+
+    async def __mget(self, keys):
+        with observe(REDIS_DURATION, "mget"):
+            data = await self.redis.mget(keys)
+        logger.debug("Redis MGET keys=%d", len(keys))
+        return [value.decode("utf-8") if value else None for value in data]
 
-            if ttl is not None:
-                result = await self.redis.setex(key, ttl, encoded_value)
-            else:
-                result = await self.redis.set(key, encoded_value)
+    async def keys(self, prefix):
+        """Return the keys starting with prefix, errors are raised."""
+        with observe(REDIS_DURATION, "scan"):
+            return [
+                key async for key in self.redis.scan_iter(match=f"{prefix}*", count=1000)
+            ]
 
-            print(f"Redis SET result: {result}")
+    async def delete(self, *keys):
+        try:
+            with observe(REDIS_DURATION, "delete"):
+                result = await self.redis.delete(*keys)
+            logger.debug("Redis DEL keys=%d deleted=%d", len(keys), result)
             return result
         except Exception as e:
-            print(f"Error in Redis SET operation: {e}")
+            logger.warning("Redis DEL keys=%d error=%s", len(keys), e)
+            return 0
+
+    async def acquire_lock(self, key, token, ttl):
+        """Try to take a short lock, returns None when Redis is unavailable."""
+        try:
+            with observe(REDIS_DURATION, "lock"):
+                result = await self.redis.set(
+                    key, token, nx=True, px=int(ttl * 1000)
+                )
+            logger.debug("Redis LOCK key=%s acquired=%s", key, bool(result))
+            return bool(result)
+        except Exception as e:
+            logger.warning("Redis LOCK key=%s error=%s", key, e)
+            return None
+
+    async def release_lock(self, key, token):
+        try:
+            with observe(REDIS_DURATION, "unlock"):
+                return bool(await self.redis.eval(RELEASE_LOCK_SCRIPT, 1, key, token))
+        except Exception as e:
+            logger.warning("Redis UNLOCK key=%s error=%s", key, e)
             return False
+
+    async def publish(self, channel, message):
+        try:
+            with observe(REDIS_DURATION, "publish"):
+                return await self.redis.publish(channel, message)
+        except Exception as e:
+            logger.warning("Redis PUBLISH channel=%s error=%s", channel, e)
+            return 0
+
+    async def close(self):
+        await self.redis.aclose()
+        if self.__pubsub_redis is not None:
+            await self.__pubsub_redis.aclose()
+
+    def pubsub(self):
+        # Subscribers sit idle between messages, so they get a client without
+        # the socket timeout applied to regular commands.
+        if self.__pubsub_redis is None:
+            self.__pubsub_redis = Redis.from_url(self.redis_url)
+        return self.__pubsub_redis.pubsub()
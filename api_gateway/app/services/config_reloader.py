@@ -0,0 +1,64 @@
+import asyncio
+import logging
+
+from app.clients.reroute_request_client import RerouteRequestToServiceClient
+from app.clients.upstream_registry import UpstreamRegistry
+from app.config.config import ConfigReloadSettings, ServicesConfig
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigReloader:
+    """Reloads the routing table when ``config.json`` changes.
+
+    The file is checked every ``interval`` seconds, 0 turns reloading off.
+    A file that fails to load is reported and the current table is kept.
+    Connection pools, limits and instance health are keyed by service name
+    and carry over to the new table; those of removed services are dropped
+    and their connections closed.
+    """
+
+    def __init__(
+        self,
+        services_config: ServicesConfig,
+        settings: ConfigReloadSettings,
+        reroute_client: RerouteRequestToServiceClient,
+        registry: UpstreamRegistry,
+    ):
+        self.services_config = services_config
+        self.settings = settings
+        self.reroute_client = reroute_client
+        self.registry = registry
+        self.__task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if self.settings.interval > 0:
+            self.__task = asyncio.create_task(self.__watch())
+
+    async def stop(self) -> None:
+        if self.__task is not None:
+            self.__task.cancel()
+            await asyncio.gather(self.__task, return_exceptions=True)
+            self.__task = None
+
+    async def __watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.settings.interval)
+            previous = set(self.services_config.services())
+            try:
+                if not self.services_config.reload():
+                    continue
+            except Exception as e:
+                logger.error(
+                    "Error reloading %s error=%s", self.services_config.file_path, e
+                )
+                continue
+            logger.info(
+                "Routing table reloaded services=%s",
+                ",".join(self.services_config.services()),
+            )
+            removed = previous - set(self.services_config.services())
+            if removed:
+                logger.info("Services removed services=%s", ",".join(sorted(removed)))
+                self.registry.remove_services(removed)
+                self.reroute_client.remove_services(removed)
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import time
+from typing import Any
+
+from jose import JWTError, jwt
+
+from app.clients.reroute_request_client import RerouteRequestToServiceClient
+from app.config.config import JWTSettings
+from app.utils import json_codec
+
+logger = logging.getLogger(__name__)
+
+
+class UnknownKeyError(Exception):
+    """The token's signing key isn't in the key set, it can't be checked here."""
+
+
+class JWTVerifier:
+    """Verifies token signatures and expiry without calling users_service.
+
+    HMAC algorithms use the shared secret. Asymmetric algorithms use the key
+    set users_service publishes, loaded at startup, looked up by ``kid`` and
+    fetched again when a token is signed with a key we have not seen yet.
+    Concurrent lookups share one fetch; a key that is still unknown after it
+    raises ``UnknownKeyError`` so the caller can ask users_service instead.
+    """
+
+    def __init__(
+        self, jwt_settings: JWTSettings, reroute_client: RerouteRequestToServiceClient
+    ):
+        self.jwt_settings = jwt_settings
+        self.reroute_client = reroute_client
+        self.__keys: dict[str, dict[str, Any]] = {}
+        self.__keys_fetched_at = 0.0
+        self.__refresh: asyncio.Task | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.jwt_settings.key) or not self.__is_hmac
+
+    async def start(self) -> None:
+        if not self.__is_hmac:
+            await self.__refresh_keys_if_due()
+
+    @property
+    def __is_hmac(self) -> bool:
+        return self.jwt_settings.algorithm.upper().startswith("HS")
+
+    async def verify(self, token: str) -> dict | None:
+        """Return the token claims, or None when the token is not valid.
+
+        Raises ``UnknownKeyError`` when the signing key isn't known.
+        """
+        try:
+            header = jwt.get_unverified_header(token)
+        except JWTError:
+            return None
+        if header.get("alg") != self.jwt_settings.algorithm:
+            return None
+
+        if self.__is_hmac:
+            key = self.jwt_settings.key
+        else:
+            key = await self.__get_public_key(header.get("kid"))
+
+        try:
+            return jwt.decode(token, key, algorithms=[self.jwt_settings.algorithm])
+        except JWTError:
+            return None
+
+    async def __get_public_key(self, kid: str | None) -> dict:
+        key = self.__keys.get(kid)
+        if key is None:
+            await self.__refresh_keys_if_due()
+            key = self.__keys.get(kid)
+        if key is None:
+            raise UnknownKeyError(kid)
+        return key
+
+    async def __refresh_keys_if_due(self) -> None:
+        if self.__refresh is None or self.__refresh.done():
+            if not self.__can_refresh_keys():
+                return
+            self.__refresh = asyncio.create_task(self.__refresh_keys())
+        # A cancelled caller must not cancel the fetch for the others.
+        await asyncio.shield(self.__refresh)
+
+    def __can_refresh_keys(self) -> bool:
+        elapsed = time.monotonic() - self.__keys_fetched_at
+        return elapsed >= self.jwt_settings.jwks_refresh_interval
+
+    async def __refresh_keys(self) -> None:
+        self.__keys_fetched_at = time.monotonic()
+        try:
+            response = await self.reroute_client.send(
+                service_name="users_service",
+                path=self.jwt_settings.jwks_path,
+                method="GET",
+                headers={},
+            )
+            response.raise_for_status()
+            keys = json_codec.loads(response.content)["keys"]
+        except Exception as e:
+            logger.warning("Error fetching JWKS error=%s", e)
+            return
+        self.__keys = {key.get("kid"): key for key in keys}
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+
+from app.config.config import RevocationFilterSettings
+from app.repositories.redis_repository import RedisRepository
+from app.utils.bloom_filter import BloomFilter
+
+BLACKLIST_PREFIX = "black_list_jwt:"
+REVOCATION_CHANNEL = "jwt:revoked"
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationFilter:
+    """Local Bloom filter over blacklisted token fingerprints.
+
+    Rebuilt from Redis every ``sync_interval`` seconds, since blacklist
+    entries expire and a Bloom filter cannot drop them, and updated right
+    away from the channel users_service publishes revocations on. Until the
+    first sync succeeds every token is reported as possibly revoked, so
+    callers fall back to asking Redis.
+    """
+
+    def __init__(
+        self, settings: RevocationFilterSettings, redis_repository: RedisRepository
+    ):
+        self.settings = settings
+        self.redis_repository = redis_repository
+        self.__filter: BloomFilter | None = None
+        self.__pending: set[str] | None = None
+        self.__tasks: list[asyncio.Task] = []
+
+    def might_be_revoked(self, fingerprint: str) -> bool:
+        return self.__filter is None or fingerprint in self.__filter
+
+    async def start(self) -> None:
+        self.__tasks = [
+            asyncio.create_task(self.__sync_periodically()),
+            asyncio.create_task(self.__listen()),
+        ]
+
+    async def stop(self) -> None:
+        for task in self.__tasks:
+            task.cancel()
+        await asyncio.gather(*self.__tasks, return_exceptions=True)
+        self.__tasks = []
+
+    def __add(self, fingerprint: str) -> None:
+        if self.__filter is not None:
+            self.__filter.add(fingerprint)
+        if self.__pending is not None:
+            self.__pending.add(fingerprint)
+
+    async def __sync(self) -> None:
+        # Revocations published while scanning are replayed into the new filter.
+        self.__pending = set()
+        try:
+            keys = await self.redis_repository.keys(BLACKLIST_PREFIX)
+            new_filter = BloomFilter(
+                max(self.settings.capacity, len(keys) * 2), self.settings.error_rate
+            )
+            for key in keys:
+                new_filter.add(key.decode("utf-8").removeprefix(BLACKLIST_PREFIX))
+            for fingerprint in self.__pending:
+                new_filter.add(fingerprint)
+            self.__filter = new_filter
+        finally:
+            self.__pending = None
+
+    async def __sync_periodically(self) -> None:
+        while True:
+            try:
+                await self.__sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Revocation filter sync error=%s", e)
+                self.__filter = None
+            await asyncio.sleep(self.settings.sync_interval)
+
+    async def __listen(self) -> None:
+        while True:
+            try:
+                async with self.redis_repository.pubsub() as pubsub:
+                    await pubsub.subscribe(REVOCATION_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self.__add(message["data"].decode("utf-8"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Revocation listener error=%s", e)
+                # Revocations may have been missed, ask Redis until resynced.
+                self.__filter = None
+                await asyncio.sleep(1)
@@ -0,0 +1,32 @@
+import math
+
+
+class BloomFilter:
+    """Probabilistic set of hex SHA-256 fingerprints.
+
+    The fingerprints are already uniformly distributed, so bit positions are
+    sliced straight out of them instead of hashing again.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(
+            8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        )
+        self.hash_count = min(
+            8, max(1, round(self.size / capacity * math.log(2)))
+        )
+        self.__bits = bytearray((self.size + 7) // 8)
+
+    def add(self, fingerprint: str) -> None:
+        for position in self.__positions(fingerprint):
+            self.__bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, fingerprint: str) -> bool:
+        return all(
+            self.__bits[position >> 3] & (1 << (position & 7))
+            for position in self.__positions(fingerprint)
+        )
+
+    def __positions(self, fingerprint: str):
+        for i in range(self.hash_count):
+            yield int(fingerprint[i * 8 : i * 8 + 8], 16) % self.size
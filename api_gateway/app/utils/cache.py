@@ -1,29 +1,284 @@
-import json
-from datetime import datetime
-from functools import wraps
-from typing import Annotated, Any
-from uuid import UUID
+import asyncio
+import hashlib
+import logging
+from functools import partial, wraps
+from typing import Annotated, Any, Mapping
+from urllib.parse import urlencode
+from uuid import uuid4
 
 from dependency_injector.wiring import Provide, inject
-from fastapi import Depends
-from fastapi.responses import JSONResponse, Response
+from fastapi import Depends, Request
+from fastapi.responses import Response, StreamingResponse
 
+from app.clients.reroute_request_client import RerouteRequestToServiceClient
+from app.config.config import CachePolicy, CacheSettings, ServicesConfig
 from app.repositories.redis_repository import RedisRepository
 from app.containers.container import Container
+from app.utils.cache_entry import CacheEntry
+from app.utils import json_codec
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.local_cache import CACHE_INVALIDATION_CHANNEL, LocalCache
+from app.utils.metrics import CACHE_REQUESTS
+from app.utils.single_flight import SingleFlight
 
+logger = logging.getLogger(__name__)
 
-def custom_serializer(obj: Any) -> str:
-    if isinstance(obj, UUID):
-        return str(obj)
-    elif isinstance(obj, datetime):
-        return obj.isoformat()
-    elif hasattr(obj, "__dict__"):
+_background_tasks: set[asyncio.Task] = set()
+
+
+def custom_serializer(obj: Any) -> Any:
+    """Fallback for objects the JSON codec can't encode."""
+    if hasattr(obj, "__dict__"):
         return obj.__dict__
+    return str(obj)
+
+
+async def invalidate_cache(redis_repository: RedisRepository, keys: list[str]) -> None:
+    """Drop cached entries by key in Redis and in every worker's L1."""
+    await redis_repository.delete(*keys)
+    await redis_repository.publish(CACHE_INVALIDATION_CHANNEL, "\n".join(keys))
+
+
+def invalidate_after_write(
+    services_config: ServicesConfig,
+    redis_repository: RedisRepository,
+    request: Request,
+    response: Any,
+    hash_name: str,
+    service_name: str,
+    path: str,
+) -> None:
+    """Drop the entries listed in the route's ``invalidates`` after a write.
+
+    Only the exact keys of those paths without query parameters are deleted,
+    for the vary headers of the writing request; other variants expire by
+    TTL. Routes without ``invalidates`` cost nothing.
+    """
+    if not 200 <= getattr(response, "status_code", 200) < 300:
+        return
+    service_config = services_config.get_service_config(service_name)
+    if service_config is None:
+        return
+    invalidates = service_config.get_cache_policy(path).invalidates
+    if not invalidates:
+        return
+    keys = [
+        build_cache_key(
+            hash_name,
+            service_name,
+            cached_path,
+            [],
+            request.headers,
+            service_config.get_cache_policy(cached_path),
+        )
+        for cached_path in invalidates
+    ]
+    _run_in_background(invalidate_cache(redis_repository, keys))
+
+
+def _run_in_background(coro) -> None:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _store(
+    redis_repository: RedisRepository,
+    cache_breaker: CircuitBreaker,
+    cache_key: str,
+    entry: CacheEntry,
+    expiration_time: int,
+) -> None:
+    success = await redis_repository.set(cache_key, entry.dumps(), ttl=expiration_time)
+    logger.debug("Cache save key=%s result=%s", cache_key, success)
+    if success:
+        cache_breaker.record_success()
     else:
-        return str(obj)
+        cache_breaker.record_failure()
+
+
+def _load_entry(cached_value: bytes) -> CacheEntry | None:
+    try:
+        return CacheEntry.loads(cached_value)
+    except Exception as e:
+        logger.warning("Error deserializing cached data error=%s, treating as a miss", e)
+        return None
+
+
+def _remember(
+    local_cache: LocalCache, cache_key: str, entry: CacheEntry, ttl: float
+) -> CacheEntry:
+    """Keep an entry in the local cache for at most ttl seconds."""
+    local_cache.set(cache_key, entry, size=entry.size, ttl=ttl)
+    return entry
+
+
+async def _wait_for_peer(
+    redis_repository: RedisRepository, cache_key: str, cache_settings: CacheSettings
+) -> tuple[CacheEntry | None, float | None]:
+    """Poll Redis while another worker holding the lock fills the key."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + cache_settings.lock_timeout
+    while loop.time() < deadline:
+        await asyncio.sleep(cache_settings.lock_poll_interval)
+        try:
+            cached_value, ttl = await redis_repository.get_with_ttl(cache_key)
+        except Exception as e:
+            logger.warning("Error in cache operations key=%s error=%s", cache_key, e)
+            return None, None
+        if cached_value:
+            return _load_entry(cached_value), ttl
+    return None, None
+
 
+async def _refresh(
+    reroute_client: RerouteRequestToServiceClient,
+    redis_repository: RedisRepository,
+    cache_breaker: CircuitBreaker,
+    local_cache: LocalCache,
+    cache_settings: CacheSettings,
+    cache_key: str,
+    service_name: str,
+    path: str,
+    headers: dict[str, str],
+    params: list[tuple[str, str]],
+    expiration_time: int,
+    stale_time: int,
+    cacheable_statuses: list[int],
+) -> None:
+    """Fetch a stale entry from the service again and store the new value."""
+    lock_key = f"refresh:{cache_key}"
+    lock_token = uuid4().hex
+    locked = None
+    if cache_settings.lock_timeout > 0:
+        locked = await redis_repository.acquire_lock(
+            lock_key, lock_token, cache_settings.lock_timeout
+        )
+        if locked is False:
+            logger.debug("Another worker is refreshing key=%s", cache_key)
+            return
+    try:
+        response = await reroute_client.send(
+            service_name=service_name,
+            path=path,
+            method="GET",
+            headers=headers,
+            params=params,
+        )
+        if response.status_code not in cacheable_statuses:
+            logger.info(
+                "Refresh of key=%s returned status=%s", cache_key, response.status_code
+            )
+            return
+        entry = CacheEntry.from_body(
+            response.content,
+            response.headers.get("content-type"),
+            response.status_code,
+            cache_settings.compression_level,
+        )
+        _remember(local_cache, cache_key, entry, expiration_time)
+        await _store(
+            redis_repository,
+            cache_breaker,
+            cache_key,
+            entry,
+            expiration_time + stale_time,
+        )
+        logger.debug("Refreshed stale key=%s", cache_key)
+    except Exception as e:
+        logger.warning("Error refreshing cache key=%s error=%s", cache_key, e)
+    finally:
+        if locked:
+            await redis_repository.release_lock(lock_key, lock_token)
+
+
+def build_cache_key(
+    hash_name: str,
+    service_name: str,
+    path: str,
+    query_params: list[tuple[str, str]],
+    headers: Mapping[str, str],
+    policy: CachePolicy,
+) -> str:
+    """Build a key that does not depend on the order of query parameters.
+
+    Values of the policy's vary headers, e.g. the Authorization header for
+    per-user endpoints, are hashed into the key.
+    """
+    cache_key = f"{hash_name}:{service_name}:{path}:{urlencode(sorted(query_params))}"
+    if policy.vary_headers:
+        vary = "\n".join(headers.get(name, "") for name in policy.vary_headers)
+        cache_key = f"{cache_key}:{hashlib.sha256(vary.encode()).hexdigest()}"
+    return cache_key
+
+
+def refresh_headers(headers: Mapping[str, str], policy: CachePolicy) -> dict[str, str]:
+    """Headers a background refresh sends upstream.
+
+    Only what the entry varies on and the credentials are kept. Forwarding
+    the triggering request's conditional headers would get a 304 and leave
+    the stale entry as it is.
+    """
+    names = {"authorization", *(name.lower() for name in policy.vary_headers)}
+    return {name: value for name, value in headers.items() if name.lower() in names}
+
+
+def _build_entry(
+    result: Any, cacheable_statuses: list[int], compression_level: int
+) -> CacheEntry | None:
+    if isinstance(result, StreamingResponse):
+        logger.debug("Streaming response, skipping cache storage")
+        return None
+    if isinstance(result, Response):
+        if result.status_code not in cacheable_statuses:
+            logger.debug("Status %s is not cacheable", result.status_code)
+            return None
+        return CacheEntry.from_body(
+            result.body,
+            result.headers.get("content-type"),
+            result.status_code,
+            compression_level,
+        )
+    if isinstance(result, dict) or isinstance(result, list):
+        return CacheEntry.from_body(
+            json_codec.dumps(result, default=custom_serializer),
+            "application/json",
+            compression_level=compression_level,
+        )
+    try:
+        return CacheEntry.from_body(
+            str(result).encode("utf-8"),
+            "text/plain; charset=utf-8",
+            compression_level=compression_level,
+        )
+    except Exception as e:
+        logger.warning("Failed to convert result to string error=%s", e)
+        return None
+
+
+def get_redis_cache(hash_name: str, expiration_time: int, stale_time: int = None):
+    """Cache GET responses in the local cache and in Redis.
+
+    The service's cache policy in ``config.json`` decides whether a route is
+    cached, for how long, which statuses are stored and which headers the
+    key varies on; the decorator arguments are the defaults.
+
+    Entries are fresh for the TTL and kept for another stale window
+    (``CACHE_STALE_TTL`` by default). A stale entry is served right away
+    while a background task refreshes it from the service.
+
+    Entries are stored as compressed bytes with their ETag and content type;
+    hits are sent back without decoding and conditional requests get a 304.
+
+    A request costs at most one Redis round trip: a pipelined GET/PTTL on the
+    lookup, while the write after a miss is done in the background. When
+    Redis keeps failing the circuit breaker skips the cache for a cool-down
+    window.
+
+    Concurrent misses for a key share one upstream call within the worker,
+    and with ``CACHE_LOCK_TIMEOUT`` set across workers through a Redis lock.
+    """
 
-def get_redis_cache(hash_name: str, expiration_time: int):
     def decorator(func):
         @wraps(func)
         @inject
@@ -32,17 +287,26 @@ def get_redis_cache(hash_name: str, expiration_time: int):
             redis_repository: Annotated[
                 RedisRepository, Depends(Provide[Container.redis_repository])
             ] = None,
+            local_cache: Annotated[
+                LocalCache, Depends(Provide[Container.local_cache])
+            ] = None,
+            cache_breaker: Annotated[
+                CircuitBreaker, Depends(Provide[Container.cache_breaker])
+            ] = None,
+            cache_settings: Annotated[
+                CacheSettings, Depends(Provide[Container.cache_settings])
+            ] = None,
+            single_flight: Annotated[
+                SingleFlight, Depends(Provide[Container.single_flight])
+            ] = None,
+            refresh_client: Annotated[
+                RerouteRequestToServiceClient, Depends(Provide[Container.reroute_client])
+            ] = None,
+            services_config: Annotated[
+                ServicesConfig, Depends(Provide[Container.services_config])
+            ] = None,
             **kwargs,
         ):
-            try:
-                is_redis_available = await redis_repository.ping()
-                if not is_redis_available:
-                    print("Redis is not available, skipping cache")
-                    return await func(*args, **kwargs)
-            except Exception as e:
-                print(f"Error checking Redis connection: {e}")
-                return await func(*args, **kwargs)
-
             request = None
             service_name = None
             path = None
@@ -50,24 +314,44 @@ def get_redis_cache(hash_name: str, expiration_time: int):
             for arg in args:
                 if hasattr(arg, "method"):
                     request = arg
-                    print(f"Found request in args: method={request.method}")
+            if request is None and "request" in kwargs:
+                request = kwargs["request"]
 
             if "service_name" in kwargs:
                 service_name = kwargs["service_name"]
-                print(f"Found service_name in kwargs: {service_name}")
             if "path" in kwargs:
                 path = kwargs["path"]
-                print(f"Found path in kwargs: {path}")
 
             if request and request.method != "GET":
-                print(f"Skipping cache for non-GET method: {request.method}")
                 return await func(*args, **kwargs)
 
+            policy = CachePolicy()
+            if service_name:
+                service_config = services_config.get_service_config(service_name)
+                if service_config is None:
+                    return await func(*args, **kwargs)
+                policy = service_config.get_cache_policy(path or "")
+            if not policy.enabled:
+                CACHE_REQUESTS.labels("bypass").inc()
+                return await func(*args, **kwargs)
+
+            cache_ttl = expiration_time if policy.ttl is None else policy.ttl
+            stale_ttl = policy.stale_ttl
+            if stale_ttl is None:
+                stale_ttl = cache_settings.stale_ttl if stale_time is None else stale_time
+
+            if request:
+                request.state.cacheable = True
+
             if request and service_name and path:
-                query_params = ""
-                if hasattr(request, "query_params"):
-                    query_params = str(request.query_params)
-                cache_key = f"{hash_name}:{service_name}:{path}:{query_params}"
+                cache_key = build_cache_key(
+                    hash_name,
+                    service_name,
+                    path,
+                    request.query_params.multi_items(),
+                    request.headers,
+                    policy,
+                )
             else:
                 parts = []
                 if service_name:
@@ -76,82 +360,121 @@ def get_redis_cache(hash_name: str, expiration_time: int):
                     parts.append(path)
                 cache_key = f"{hash_name}:{':'.join(parts) or 'default'}"
 
-            print(f"Cache key: {cache_key}")
+            local_entry = local_cache.get(cache_key)
+            if local_entry is not None:
+                logger.debug("Cache result=local_hit key=%s", cache_key)
+                CACHE_REQUESTS.labels("local_hit").inc()
+                return local_entry.to_response(request, policy.vary_headers)
 
-            try:
-                print(f"Attempting to get data from cache with key: {cache_key}")
-                cached_value = await redis_repository.get(cache_key)
-
-                if cached_value:
-                    print(f"Cache HIT for key: {cache_key}")
-                    try:
-                        deserialized_data = json.loads(cached_value)
-                        print(f"Successfully deserialized cached data")
-                        return deserialized_data
-                    except json.JSONDecodeError as e:
-                        print(
-                            f"Error deserializing cached data: {e}, returning as raw string"
-                        )
-                        return cached_value
-                else:
-                    print(f"Cache MISS for key: {cache_key}")
-
-                print(f"Executing original function...")
-                result = await func(*args, **kwargs)
-                print(f"Function executed, result type: {type(result)}")
-
-                cache_data = None
-
-                if isinstance(result, JSONResponse):
-                    print(f"Extracting JSON data from JSONResponse for caching")
-                    try:
-                        cache_data = result.body.decode("utf-8")
-                        print(f"Successfully extracted JSON data from response")
-                    except Exception as e:
-                        print(f"Failed to extract JSON from response: {e}")
-
-                elif isinstance(result, Response):
-                    print(f"Response is not JSONResponse, skipping cache storage")
-                    return result
-                elif isinstance(result, dict) or isinstance(result, list):
-                    cache_data = json.dumps(result, default=custom_serializer)
-                    print(f"Result is directly serializable object")
-                else:
-                    print(f"Result is not JSON-serializable, converting to string")
-                    try:
-                        cache_data = str(result)
-                    except Exception as e:
-                        print(f"Failed to convert result to string: {e}")
-                        return result
+            if not cache_breaker.allow_request():
+                logger.debug("Redis circuit is open, skipping cache")
+                CACHE_REQUESTS.labels("bypass").inc()
+                return await func(*args, **kwargs)
 
-                if not cache_data:
-                    print(f"No cacheable data extracted, skipping cache storage")
-                    return result
+            try:
+                cached_value, ttl = await redis_repository.get_with_ttl(cache_key)
+                cache_breaker.record_success()
+            except Exception as e:
+                logger.warning("Error in cache operations key=%s error=%s", cache_key, e)
+                cache_breaker.record_failure()
+                CACHE_REQUESTS.labels("bypass").inc()
+                return await func(*args, **kwargs)
 
-                try:
+            entry = _load_entry(cached_value) if cached_value else None
+            if entry is not None:
+                fresh_ttl = ttl - stale_ttl if ttl is not None else cache_ttl
+                if fresh_ttl > 0:
+                    logger.debug("Cache result=hit key=%s", cache_key)
+                    CACHE_REQUESTS.labels("hit").inc()
+                    _remember(local_cache, cache_key, entry, fresh_ttl)
+                    return entry.to_response(request, policy.vary_headers)
 
-                    success = await redis_repository.set(
+                logger.debug("Cache result=stale key=%s", cache_key)
+                CACHE_REQUESTS.labels("stale").inc()
+                if request and service_name and path:
+                    refresh = partial(
+                        _refresh,
+                        refresh_client,
+                        redis_repository,
+                        cache_breaker,
+                        local_cache,
+                        cache_settings,
                         cache_key,
-                        cache_data,
-                        ttl=expiration_time,
+                        service_name,
+                        path,
+                        refresh_headers(request.headers, policy),
+                        request.query_params.multi_items(),
+                        cache_ttl,
+                        stale_ttl,
+                        policy.cacheable_statuses,
+                    )
+                    _run_in_background(
+                        single_flight.do(f"refresh:{cache_key}", refresh)
                     )
-                    print(f"Cache save result: {success}")
+                return entry.to_response(request, policy.vary_headers)
 
-                    print(f"Verifying cache save...")
-                    verification = await redis_repository.get(cache_key)
+            logger.debug("Cache result=miss key=%s", cache_key)
+            CACHE_REQUESTS.labels("miss").inc()
 
-                    if verification:
-                        print(f"Verification successful - data cached")
-                    else:
-                        print(f"Verification failed - data not cached")
+            async def load():
+                lock_key = f"lock:{cache_key}"
+                lock_token = uuid4().hex
+                locked = None
+                if cache_settings.lock_timeout > 0:
+                    locked = await redis_repository.acquire_lock(
+                        lock_key, lock_token, cache_settings.lock_timeout
+                    )
+                    if locked is False:
+                        peer_entry, peer_ttl = await _wait_for_peer(
+                            redis_repository, cache_key, cache_settings
+                        )
+                        if peer_entry is not None:
+                            logger.debug("Cache filled by another worker key=%s", cache_key)
+                            return _remember(
+                                local_cache,
+                                cache_key,
+                                peer_entry,
+                                (
+                                    peer_ttl - stale_ttl
+                                    if peer_ttl is not None
+                                    else cache_ttl
+                                ),
+                            )
+                try:
+                    result = await func(*args, **kwargs)
 
-                except Exception as e:
-                    print(f"Error during cache saving: {e}")
+                    new_entry = _build_entry(
+                        result,
+                        policy.cacheable_statuses,
+                        cache_settings.compression_level,
+                    )
+                    if new_entry is None:
+                        return result
 
-                return result
-            except Exception as e:
-                print(f"Error in cache operations: {e}")
-                return await func(*args, **kwargs)
+                    _remember(local_cache, cache_key, new_entry, cache_ttl)
+                    store = _store(
+                        redis_repository,
+                        cache_breaker,
+                        cache_key,
+                        new_entry,
+                        cache_ttl + stale_ttl,
+                    )
+                    if locked:
+                        # Workers waiting on the lock poll for the value.
+                        await store
+                    else:
+                        _run_in_background(store)
+                    return new_entry
+                finally:
+                    if locked:
+                        await redis_repository.release_lock(lock_key, lock_token)
+
+            # Coalesced requests share the entry, but each one gets its own
+            # response for its Accept-Encoding and If-None-Match headers.
+            loaded = await single_flight.do(cache_key, load)
+            if isinstance(loaded, CacheEntry):
+                return loaded.to_response(request, policy.vary_headers)
+            return loaded
 
         return wrapper
 
@@ -0,0 +1,108 @@
+import gzip
+import hashlib
+import struct
+from dataclasses import dataclass
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.utils import json_codec
+
+FORMAT_VERSION = b"GC1"
+MIN_COMPRESS_SIZE = 256
+_META_LENGTH = struct.Struct(">H")
+
+
+@dataclass
+class CacheEntry:
+    """A cached response body, stored compressed together with its metadata.
+
+    Cache hits are answered with the stored bytes as they are when the client
+    accepts the encoding, so the body is never parsed or re-serialized.
+    """
+
+    body: bytes
+    encoding: str
+    content_type: str | None
+    etag: str
+    status_code: int = 200
+
+    @classmethod
+    def from_body(
+        cls,
+        body: bytes,
+        content_type: str | None,
+        status_code: int = 200,
+        compression_level: int = 6,
+    ) -> "CacheEntry":
+        # A weak tag, the gzip and identity forms of the body share it.
+        etag = f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        encoding = "identity"
+        if len(body) >= MIN_COMPRESS_SIZE:
+            body = gzip.compress(body, compresslevel=compression_level, mtime=0)
+            encoding = "gzip"
+        return cls(
+            body=body,
+            encoding=encoding,
+            content_type=content_type,
+            etag=etag,
+            status_code=status_code,
+        )
+
+    @classmethod
+    def loads(cls, data: bytes) -> "CacheEntry":
+        if not data.startswith(FORMAT_VERSION):
+            raise ValueError("Unknown cache entry format")
+        offset = len(FORMAT_VERSION)
+        (meta_length,) = _META_LENGTH.unpack_from(data, offset)
+        offset += _META_LENGTH.size
+        meta = json_codec.loads(data[offset : offset + meta_length])
+        return cls(body=data[offset + meta_length :], **meta)
+
+    def dumps(self) -> bytes:
+        meta = json_codec.dumps(
+            {
+                "encoding": self.encoding,
+                "content_type": self.content_type,
+                "etag": self.etag,
+                "status_code": self.status_code,
+            }
+        )
+        return FORMAT_VERSION + _META_LENGTH.pack(len(meta)) + meta + self.body
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+    def to_response(
+        self, request: Request | None, vary_headers: list[str] = ()
+    ) -> Response:
+        """Build the response, ``vary_headers`` are the ones the key varies on."""
+        request_headers = request.headers if request is not None else {}
+        vary = ", ".join(["Accept-Encoding", *vary_headers])
+        headers = {"ETag": self.etag, "Vary": vary}
+        if self.__matches(request_headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
+
+        body = self.body
+        if self.encoding != "identity":
+            if self.encoding in request_headers.get("accept-encoding", ""):
+                headers["Content-Encoding"] = self.encoding
+            else:
+                body = gzip.decompress(body)
+        return Response(
+            content=body,
+            status_code=self.status_code,
+            headers=headers,
+            media_type=self.content_type,
+        )
+
+    def __matches(self, if_none_match: str | None) -> bool:
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        etag = self.etag.removeprefix("W/")
+        return any(
+            tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+        )
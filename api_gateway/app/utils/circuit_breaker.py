@@ -0,0 +1,53 @@
+import time
+from enum import Enum
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Skips calls to a failing dependency for a cool-down window.
+
+    After ``failure_threshold`` consecutive failures the circuit opens. Once
+    ``reset_timeout`` seconds have passed a single trial call is let through;
+    its outcome either closes the circuit or opens it for another window.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.__state = CircuitState.CLOSED
+        self.__failures = 0
+        self.__opened_at = 0.0
+
+    @property
+    def state(self) -> CircuitState:
+        return self.__state
+
+    def allow_request(self) -> bool:
+        if self.__state is CircuitState.CLOSED:
+            return True
+        # In the half-open state a trial call is already in flight, another one
+        # is let through only if the first never reported back.
+        now = time.monotonic()
+        if now - self.__opened_at < self.reset_timeout:
+            return False
+        self.__state = CircuitState.HALF_OPEN
+        self.__opened_at = now
+        return True
+
+    def record_success(self) -> None:
+        self.__state = CircuitState.CLOSED
+        self.__failures = 0
+
+    def record_failure(self) -> None:
+        self.__failures += 1
+        if (
+            self.__state is CircuitState.HALF_OPEN
+            or self.__failures >= self.failure_threshold
+        ):
+            self.__state = CircuitState.OPEN
+            self.__opened_at = time.monotonic()
@@ -0,0 +1,109 @@
+import asyncio
+import time
+from collections import deque
+
+
+class ConcurrencyLimitExceeded(Exception):
+    pass
+
+
+class AdaptiveConcurrencyLimiter:
+    """Caps in-flight calls with a limit adapted to the observed latency.
+
+    The limit grows by about one per round of calls while latency stays within
+    ``latency_tolerance`` times the long-term average, and is cut by
+    ``backoff_ratio`` when it rises above it or a call fails, at most once per
+    round trip. Callers over the limit wait in a queue of ``queue_size`` for up
+    to ``queue_timeout`` seconds, otherwise ConcurrencyLimitExceeded is raised.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        queue_size: int,
+        queue_timeout: float,
+        latency_tolerance: float,
+        backoff_ratio: float = 0.9,
+        smoothing: float = 0.002,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.smoothing = smoothing
+        self.__limit = float(initial_limit)
+        self.__in_flight = 0
+        self.__waiters: deque[asyncio.Future] = deque()
+        self.__baseline: float | None = None
+        self.__last_decrease = 0.0
+
+    @property
+    def limit(self) -> int:
+        return int(self.__limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self.__in_flight
+
+    @property
+    def queued(self) -> int:
+        return len(self.__waiters)
+
+    async def acquire(self) -> None:
+        if self.__in_flight < self.limit and not self.__waiters:
+            self.__in_flight += 1
+            return
+        if len(self.__waiters) >= self.queue_size:
+            raise ConcurrencyLimitExceeded()
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.__waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            # The slot may have been handed over just before the cancellation.
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            if isinstance(e, asyncio.TimeoutError):
+                raise ConcurrencyLimitExceeded()
+            raise
+        finally:
+            if waiter in self.__waiters:
+                self.__waiters.remove(waiter)
+
+    def release(self, latency: float | None = None, dropped: bool = False) -> None:
+        """Free the slot and adapt the limit to the outcome of the call."""
+        self.__in_flight -= 1
+        if dropped:
+            self.__decrease()
+        elif latency is not None:
+            self.__on_sample(latency)
+        self.__wake_waiters()
+
+    def __on_sample(self, latency: float) -> None:
+        if self.__baseline is None:
+            self.__baseline = latency
+        if latency > self.__baseline * self.latency_tolerance:
+            self.__decrease(latency)
+        elif self.__in_flight + 1 >= self.limit / 2:
+            # Only grow while the limit is actually being used.
+            self.__limit = min(self.max_limit, self.__limit + 1 / self.__limit)
+        self.__baseline += (latency - self.__baseline) * self.smoothing
+
+    def __decrease(self, latency: float = 0.0) -> None:
+        now = time.monotonic()
+        if now - self.__last_decrease < max(latency, self.__baseline or 0.0):
+            return
+        self.__last_decrease = now
+        self.__limit = max(self.min_limit, self.__limit * self.backoff_ratio)
+
+    def __wake_waiters(self) -> None:
+        while self.__waiters and self.__in_flight < self.limit:
+            waiter = self.__waiters.popleft()
+            if not waiter.done():
+                self.__in_flight += 1
+                waiter.set_result(None)
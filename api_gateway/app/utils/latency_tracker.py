@@ -0,0 +1,27 @@
+from collections import deque
+
+
+class LatencyTracker:
+    """Keeps recent latencies and a periodically recomputed percentile."""
+
+    def __init__(self, percentile: float, window: int = 1000, min_samples: int = 100):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.__samples: deque[float] = deque(maxlen=window)
+        self.__since_update = 0
+        self.__value: float | None = None
+
+    def record(self, seconds: float) -> None:
+        self.__samples.append(seconds)
+        self.__since_update += 1
+        # Sorting the window on every request would cost more than it saves.
+        if self.__since_update >= self.min_samples:
+            self.__since_update = 0
+            ordered = sorted(self.__samples)
+            index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+            self.__value = ordered[index]
+
+    @property
+    def value(self) -> float | None:
+        """The percentile, None until enough samples were seen."""
+        return self.__value
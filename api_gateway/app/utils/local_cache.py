@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any
+
+from app.repositories.redis_repository import RedisRepository
+
+CACHE_INVALIDATION_CHANNEL = "gateway:cache:invalidate"
+
+logger = logging.getLogger(__name__)
+
+
+class LocalCache:
+    """Bounded in-process LRU cache with per-entry TTL.
+
+    Sits in front of Redis, the byte size of an entry is the length of its
+    serialized value.
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.__entries: OrderedDict[str, tuple[float, int, Any]] = OrderedDict()
+        self.__size = 0
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def get(self, key: str) -> Any | None:
+        entry = self.__entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _, value = entry
+        if expires_at <= time.monotonic():
+            self.__pop(key)
+            return None
+        self.__entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, size: int, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or size > self.max_bytes:
+            self.__pop(key)
+            return
+        self.__pop(key)
+        self.__entries[key] = (time.monotonic() + ttl, size, value)
+        self.__size += size
+        while self.__size > self.max_bytes or len(self.__entries) > self.max_entries:
+            self.__pop(next(iter(self.__entries)))
+
+    def invalidate(self, key: str) -> None:
+        self.__pop(key)
+
+    def clear(self) -> None:
+        self.__entries.clear()
+        self.__size = 0
+
+    def __pop(self, key: str) -> None:
+        entry = self.__entries.pop(key, None)
+        if entry is not None:
+            self.__size -= entry[1]
+
+
+class CacheInvalidationListener:
+    """Drops local cache entries when a worker publishes invalidated keys.
+
+    A message carries the keys separated by newlines.
+    """
+
+    def __init__(self, local_cache: LocalCache, redis_repository: RedisRepository):
+        self.local_cache = local_cache
+        self.redis_repository = redis_repository
+        self.__task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        self.__task = asyncio.create_task(self.__listen())
+
+    async def stop(self) -> None:
+        if self.__task is None:
+            return
+        self.__task.cancel()
+        try:
+            await self.__task
+        except asyncio.CancelledError:
+            pass
+        self.__task = None
+
+    async def __listen(self) -> None:
+        while True:
+            try:
+                async with self.redis_repository.pubsub() as pubsub:
+                    await pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+                    # Messages published while we were disconnected are lost.
+                    self.local_cache.clear()
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            for key in message["data"].decode("utf-8").split("\n"):
+                                self.local_cache.invalidate(key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Cache invalidation listener error=%s", e)
+                self.local_cache.clear()
+                await asyncio.sleep(1)
@@ -0,0 +1,156 @@
+import os
+import re
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+MAX_ROUTES = 500
+
+ID_SEGMENT = re.compile(r"^(\d+|[0-9a-fA-F-]{16,})$")
+
+REQUEST_DURATION = Histogram(
+    "gateway_request_duration_seconds",
+    "Time to answer a request, by service and route.",
+    ["service", "route", "method", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "gateway_requests_in_flight",
+    "Requests being handled by the gateway.",
+    ["service"],
+    multiprocess_mode="livesum",
+)
+UPSTREAM_DURATION = Histogram(
+    "gateway_upstream_request_duration_seconds",
+    "Time of a single request to an upstream instance.",
+    ["service"],
+    buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_RESPONSES = Counter(
+    "gateway_upstream_responses_total",
+    "Upstream responses by status, transport errors have status 'error'.",
+    ["service", "status"],
+)
+UPSTREAM_IN_FLIGHT = Gauge(
+    "gateway_upstream_in_flight",
+    "Requests in flight to upstream services.",
+    ["service", "group"],
+    multiprocess_mode="livesum",
+)
+UPSTREAM_CONCURRENCY_LIMIT = Gauge(
+    "gateway_upstream_concurrency_limit",
+    "Current adaptive concurrency limit.",
+    ["service", "group"],
+    multiprocess_mode="liveall",
+)
+UPSTREAM_SHED = Counter(
+    "gateway_upstream_shed_total",
+    "Requests rejected by the circuit breaker or the concurrency limit.",
+    ["service", "reason"],
+)
+CACHE_REQUESTS = Counter(
+    "gateway_cache_requests_total",
+    "Cache lookups by result: local_hit, hit, stale, miss or bypass.",
+    ["result"],
+)
+REDIS_DURATION = Histogram(
+    "gateway_redis_command_duration_seconds",
+    "Redis call latency by command.",
+    ["command"],
+    buckets=LATENCY_BUCKETS,
+)
+REDIS_PIPELINE_COMMANDS = Histogram(
+    "gateway_redis_pipeline_commands",
+    "Commands sent together by the auto-pipelining Redis client.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+REDIS_POOL_IN_USE = Gauge(
+    "gateway_redis_pool_in_use",
+    "Redis connections held by in-flight command batches.",
+    multiprocess_mode="livesum",
+)
+REDIS_POOL_SIZE = Gauge(
+    "gateway_redis_pool_size",
+    "Maximum number of connections in the Redis pool.",
+    multiprocess_mode="livesum",
+)
+CLIENT_CACHE_REQUESTS = Counter(
+    "gateway_redis_client_cache_requests_total",
+    "Key lookups in the Redis client-side cache by result: hit or miss.",
+    ["result"],
+)
+CLIENT_CACHE_BYTES = Gauge(
+    "gateway_redis_client_cache_bytes",
+    "Approximate memory held by the Redis client-side cache.",
+    multiprocess_mode="livesum",
+)
+AUTH_DURATION = Histogram(
+    "gateway_auth_duration_seconds",
+    "Time spent authenticating a request, by how it was decided.",
+    ["method", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+
+_routes: set[str] = set()
+
+
+def route_label(path: str) -> str:
+    """Collapse ids in the path and cap the number of distinct routes."""
+    route = "/".join(
+        "{id}" if ID_SEGMENT.match(segment) else segment
+        for segment in path.split("/")
+    )
+    if route in _routes:
+        return route
+    if len(_routes) >= MAX_ROUTES:
+        return "other"
+    _routes.add(route)
+    return route
+
+
+@contextmanager
+def observe(histogram: Histogram, *labels: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.labels(*labels).observe(time.perf_counter() - started)
+
+
+def render() -> tuple[bytes, str]:
+    """Return the metrics in the Prometheus text format and its content type.
+
+    With several workers PROMETHEUS_MULTIPROC_DIR has to point to a shared
+    directory so that the samples of all workers are collected.
+    """
+    registry = REGISTRY
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,21 @@
+class RetryBudget:
+    """Token bucket that caps retries to a share of regular traffic.
+
+    Every request deposits ``ratio`` tokens and every retry or hedged request
+    withdraws one, so at most ``ratio`` extra requests per request are sent
+    once the initial ``min_retries`` tokens are spent.
+    """
+
+    def __init__(self, ratio: float, min_retries: int):
+        self.ratio = ratio
+        self.max_tokens = max(float(min_retries), 1.0)
+        self.__tokens = self.max_tokens
+
+    def deposit(self) -> None:
+        self.__tokens = min(self.max_tokens, self.__tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        if self.__tokens < 1:
+            return False
+        self.__tokens -= 1
+        return True
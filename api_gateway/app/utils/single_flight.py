@@ -0,0 +1,29 @@
+import asyncio
+from typing import Any, Awaitable, Callable
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into a single call.
+
+    The first caller starts the call, callers arriving while it runs await
+    the same result. The call runs as its own task so a cancelled caller
+    does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self.__calls: dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self.__calls.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self.__calls[key] = task
+            task.add_done_callback(lambda done: self.__forget(key, done))
+        return await asyncio.shield(task)
+
+    def __forget(self, key: str, task: asyncio.Task) -> None:
+        if self.__calls.get(key) is task:
+            del self.__calls[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved when every caller went away.
+            task.exception()
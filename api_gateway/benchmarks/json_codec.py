@@ -0,0 +1,228 @@
+"""Micro-benchmark of the JSON codec against the standard library.
+
+Every case encodes or decodes a payload shaped like the ones the services
+actually exchange, once the way the code did it with ``json`` and once with
+``app.utils.json_codec``::
+
+    cd api_gateway
+    python -m benchmarks.json_codec --output json_codec_report.json
+
+Cases:
+    ticker_decode        Binance ticker event read by the producer and consumer
+    ticker_encode        the same event written to Kafka by the producer
+    currency_response    /currency response, 50 rows, rendered by FastAPI
+    batch_response       /batch response with 20 JSON bodies
+    batch_item_decode    upstream body parsed into a batch item
+    cache_store          dict result with UUIDs and datetimes stored in the cache
+    cache_entry_meta     metadata header of a cache entry, written and read
+"""
+
+import argparse
+import json
+import time
+import timeit
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+from starlette.responses import JSONResponse as StarletteJSONResponse
+from starlette.responses import Response
+
+from app.models.batch import BatchItemResponse, BatchResponse
+from app.utils import json_codec
+from app.utils.responses import JSONResponse
+from benchmarks.load_test import git_commit
+
+NOW = datetime(2025, 5, 1, 12, 30, tzinfo=timezone.utc)
+
+
+def ticker_event(symbol: str = "BTCUSDT") -> dict[str, Any]:
+    return {
+        "stream": f"{symbol.lower()}@ticker",
+        "data": {
+            "e": "24hrTicker",
+            "E": 1746102600123,
+            "s": symbol,
+            "p": "-312.40",
+            "P": "-0.327",
+            "w": "95210.33",
+            "c": "95012.10",
+            "Q": "0.004",
+            "o": "95324.50",
+            "h": "96110.00",
+            "l": "94202.70",
+            "v": "182344.117",
+            "q": "17361455123.88",
+            "O": 1746016200000,
+            "C": 1746102600120,
+            "F": 6321877151,
+            "L": 6324511902,
+            "n": 2634752,
+        },
+    }
+
+
+def currency_rows(count: int = 50) -> list[dict[str, Any]]:
+    """Rows of ``CurrencyGET`` as FastAPI hands them to the response class."""
+    return [
+        {
+            "symbol": f"C{i:03}USDT",
+            "current_price": 100 + i * 1.25,
+            "change_24h": -1.5 + i * 0.01,
+            "volatility_percent": 2.75,
+            "volume_usd": 1_250_000.5 + i,
+            "trades_count": 10_000 + i,
+            "relative_change": 0.12,
+            "volume_ratio": 1.04,
+            "volatility_ratio": 0.98,
+            "trades_ratio": 1.1,
+            "momentum_score": 0.33,
+            "avg_trade_size_usd": 125.05,
+            "intraday_change": 0.5,
+            "distance_from_high": 1.2,
+            "distance_from_low": 3.4,
+            "deviation_from_avg": 0.07,
+            "daily_range_percent": 4.6,
+            "market_state": "bullish",
+            "action_suggestion": "hold",
+            "raw_processing_time": (NOW - timedelta(seconds=i)).isoformat(),
+            "processing_time": NOW.isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+def batch_response(items: int = 20) -> BatchResponse:
+    rows = currency_rows(5)
+    return BatchResponse(
+        responses=[
+            BatchItemResponse(
+                id=str(i),
+                status=200,
+                headers={"content-type": "application/json", "etag": f'W/"{i:032x}"'},
+                body=rows,
+            )
+            for i in range(items)
+        ]
+    )
+
+
+def cache_result(count: int = 50) -> list[dict[str, Any]]:
+    return [
+        {
+            "id": uuid.UUID(int=i),
+            "symbol": f"C{i:03}USDT",
+            "price": 100 + i * 1.25,
+            "updated_at": NOW - timedelta(minutes=i),
+        }
+        for i in range(count)
+    ]
+
+
+def _legacy_serializer(obj: Any) -> Any:
+    """The cache's serializer before the codec was introduced."""
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if hasattr(obj, "__dict__"):
+        return obj.__dict__
+    return str(obj)
+
+
+def cases() -> dict[str, tuple[Callable[[], Any], Callable[[], Any]]]:
+    """Map each case to its (stdlib, codec) implementations."""
+    ticker = ticker_event()
+    ticker_raw = json.dumps(ticker)
+    ticker_bytes = ticker_raw.encode()
+    rows = currency_rows()
+    batch = batch_response()
+    # FastAPI serializes a response model to plain data before rendering it.
+    batch_data = batch.model_dump(mode="json")
+    upstream_body = json.dumps(currency_rows(20)).encode()
+    result = cache_result()
+    meta = {
+        "encoding": "gzip",
+        "content_type": "application/json",
+        "etag": 'W/"0123456789abcdef0123456789abcdef"',
+        "status_code": 200,
+    }
+
+    return {
+        "ticker_decode": (
+            lambda: json.loads(ticker_raw),
+            lambda: json_codec.loads(ticker_bytes),
+        ),
+        "ticker_encode": (
+            lambda: json.dumps(ticker).encode("utf-8"),
+            lambda: json_codec.dumps(ticker),
+        ),
+        "currency_response": (
+            lambda: StarletteJSONResponse(rows),
+            lambda: JSONResponse(rows),
+        ),
+        "batch_response": (
+            lambda: StarletteJSONResponse(batch_data),
+            lambda: JSONResponse(batch_data),
+        ),
+        "batch_item_decode": (
+            lambda: json.loads(upstream_body.decode("utf-8")),
+            lambda: json_codec.loads(upstream_body),
+        ),
+        "cache_store": (
+            lambda: json.dumps(result, default=_legacy_serializer).encode("utf-8"),
+            lambda: json_codec.dumps(result),
+        ),
+        "cache_entry_meta": (
+            lambda: json.loads(json.dumps(meta).encode("utf-8")),
+            lambda: json_codec.loads(json_codec.dumps(meta)),
+        ),
+    }
+
+
+def measure(func: Callable[[], Any], repeat: int) -> float:
+    """Return the best time of one call in microseconds."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'case':<20}{'json µs':>10}{'codec µs':>10}{'speedup':>9}")
+    for name, (stdlib, codec) in cases().items():
+        if json.loads(_as_json(stdlib())) != json.loads(_as_json(codec())):
+            raise SystemExit(f"{name}: outputs differ")
+        stdlib_us = measure(stdlib, args.repeat)
+        codec_us = measure(codec, args.repeat)
+        results[name] = {
+            "json_us": round(stdlib_us, 3),
+            "codec_us": round(codec_us, 3),
+            "speedup": round(stdlib_us / codec_us, 2),
+        }
+        print(f"{name:<20}{stdlib_us:>10.2f}{codec_us:>10.2f}{stdlib_us / codec_us:>8.1f}x")
+
+    if args.output:
+        report = {
+            "commit": git_commit(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "cases": results,
+        }
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"Report written to {args.output}")
+
+
+def _as_json(value: Any) -> bytes | str:
+    if isinstance(value, Response):
+        return value.body
+    return value if isinstance(value, (bytes, str)) else json.dumps(value)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+"""Load test for the gateway against local stub upstreams.
+
+Starts a Redis stand-in (fakeredis) unless ``--redis-url`` is given, stub
+upstreams for both services and the gateway built by
+``app.main:create_app``. It then drives a weighted mix of requests and writes
+throughput and latency percentiles to a JSON report::
+
+    cd api_gateway
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.load_test --duration 30 --output before.json
+    python -m benchmarks.load_test --duration 30 --output after.json --compare before.json
+
+Scenarios:
+    cached_get    GET of a cached currency list
+    uncached_get  GET of a route with caching disabled
+    post          POST to users_service, which drops its cached order list
+    cold_token    cached GET with a token the gateway has never seen
+
+All other scenarios reuse a token that has already been verified. Gateway
+settings can be tuned through the usual environment variables.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+GATEWAY_DIR = Path(__file__).resolve().parent.parent
+
+DEFAULT_MIX = "cached_get=60,uncached_get=20,post=10,cold_token=10"
+
+WARM_TOKEN = "benchmark-warm-token"
+
+PERCENTILES = (50, 95, 99)
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario: {name}")
+        mix[name] = float(weight)
+    return mix
+
+
+def cached_get(client: httpx.AsyncClient, rnd: random.Random):
+    return client.get("/currency_service/currency", headers=_auth(WARM_TOKEN))
+
+
+def uncached_get(client: httpx.AsyncClient, rnd: random.Random):
+    return client.get(
+        f"/currency_service/quotes/C{rnd.randrange(100):03}",
+        headers=_auth(WARM_TOKEN),
+    )
+
+
+def post(client: httpx.AsyncClient, rnd: random.Random):
+    return client.post(
+        "/users_service/orders",
+        json={"symbol": f"C{rnd.randrange(100):03}", "amount": rnd.randint(1, 10)},
+        headers=_auth(WARM_TOKEN),
+    )
+
+
+def cold_token(client: httpx.AsyncClient, rnd: random.Random):
+    token = uuid.UUID(int=rnd.getrandbits(128)).hex
+    return client.get("/currency_service/currency", headers=_auth(token))
+
+
+SCENARIOS = {
+    "cached_get": cached_get,
+    "uncached_get": uncached_get,
+    "post": post,
+    "cold_token": cold_token,
+}
+
+
+def _auth(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server for {url} exited with {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} did not become ready in {timeout} s")
+
+
+def _wait_for_port(port: int, process: subprocess.Popen, timeout: float = 20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Redis stand-in exited with {process.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1.0).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Port {port} did not open in {timeout} s")
+
+
+@contextmanager
+def running_stack(args: argparse.Namespace):
+    """Start Redis, the stubs and the gateway, yield the gateway URL."""
+    processes: list[subprocess.Popen] = []
+    output = None if args.verbose else subprocess.DEVNULL
+    env = {**os.environ, "PYTHONPATH": str(GATEWAY_DIR)}
+
+    def spawn(command: list[str], **kwargs) -> subprocess.Popen:
+        kwargs.setdefault("env", env)
+        process = subprocess.Popen(command, stdout=output, stderr=output, **kwargs)
+        processes.append(process)
+        return process
+
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            redis_url = args.redis_url
+            if redis_url is None:
+                redis_port = _free_port()
+                redis_process = spawn(
+                    [
+                        sys.executable,
+                        "-c",
+                        "from fakeredis import TcpFakeServer; "
+                        f"TcpFakeServer(('127.0.0.1', {redis_port}), "
+                        "server_type='redis').serve_forever()",
+                    ]
+                )
+                _wait_for_port(redis_port, redis_process)
+                redis_url = f"redis://127.0.0.1:{redis_port}/0"
+
+            stub_env = {**env, "STUB_LATENCY": str(args.upstream_latency)}
+            instances = []
+            for _ in range(args.upstream_instances):
+                port = _free_port()
+                stub = spawn(
+                    [
+                        sys.executable,
+                        "-m",
+                        "uvicorn",
+                        "benchmarks.stub_upstream:app",
+                        "--port",
+                        str(port),
+                        "--log-level",
+                        "warning",
+                    ],
+                    cwd=GATEWAY_DIR,
+                    env=stub_env,
+                )
+                _wait_until_ready(f"http://127.0.0.1:{port}/health", stub)
+                instances.append(f"http://127.0.0.1:{port}")
+
+            service = {
+                "instances": instances,
+                "prefix": "/api/v1",
+                "health_check": "/health",
+            }
+            config = {
+                "currency_service": {
+                    **service,
+                    "cache_routes": {"quotes/*": {"enabled": False}},
+                },
+                "users_service": {
+                    **service,
+                    "cache_routes": {
+                        "orders": {"vary_headers": ["Authorization"], "invalidates": ["orders"]}
+                    },
+                },
+            }
+            Path(workdir, "config.json").write_text(json.dumps(config))
+
+            redis = httpx.URL(redis_url)
+            gateway_port = _free_port()
+            env.update(
+                REDIS_HOST=redis.host,
+                REDIS_PORT=str(redis.port or 6379),
+                REDIS_DB=redis.path.strip("/") or "0",
+                REDIS_PASSWORD=redis.password or "",
+                REDIS_DEFAULT_TTL=env.get("REDIS_DEFAULT_TTL", "60"),
+                LOG_LEVEL=env.get("LOG_LEVEL", "WARNING"),
+            )
+            gateway = spawn(
+                [
+                    sys.executable,
+                    "-m",
+                    "uvicorn",
+                    "--factory",
+                    "app.main:create_app",
+                    "--port",
+                    str(gateway_port),
+                    "--workers",
+                    str(args.workers),
+                    "--log-level",
+                    "warning",
+                    "--no-access-log",
+                ],
+                cwd=workdir,
+            )
+            _wait_until_ready(f"http://127.0.0.1:{gateway_port}/docs", gateway)
+            yield f"http://127.0.0.1:{gateway_port}"
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+async def drive(
+    base_url: str,
+    mix: dict[str, float],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    seed: int,
+) -> dict[str, list[tuple[float, int]]]:
+    """Run the mix with ``concurrency`` workers and return samples per scenario.
+
+    Samples taken during the warmup are dropped. Every sample is a
+    (latency in seconds, status code) pair, status 0 for transport errors.
+    """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples: dict[str, list[tuple[float, int]]] = {name: [] for name in names}
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=30.0
+    ) as client:
+        # The warm token is verified once up front, as a returning user would be.
+        await cached_get(client, random.Random(seed))
+
+        loop = asyncio.get_running_loop()
+        measure_from = loop.time() + warmup
+        stop_at = measure_from + duration
+
+        async def worker(worker_id: int) -> None:
+            rnd = random.Random(seed * 1_000_003 + worker_id)
+            while (now := loop.time()) < stop_at:
+                name = rnd.choices(names, weights)[0]
+                started = time.perf_counter()
+                try:
+                    response = await SCENARIOS[name](client, rnd)
+                    status_code = response.status_code
+                except httpx.TransportError:
+                    status_code = 0
+                if now >= measure_from:
+                    samples[name].append((time.perf_counter() - started, status_code))
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return samples
+
+
+def summarize(samples: list[tuple[float, int]], duration: float) -> dict:
+    latencies = sorted(latency for latency, _ in samples)
+    statuses: dict[str, int] = {}
+    for _, status_code in samples:
+        statuses[str(status_code)] = statuses.get(str(status_code), 0) + 1
+    errors = sum(
+        count for status, count in statuses.items() if not 200 <= int(status) < 400
+    )
+    summary = {
+        "requests": len(samples),
+        "errors": errors,
+        "throughput_rps": round(len(samples) / duration, 2),
+        "goodput_rps": round((len(samples) - errors) / duration, 2),
+        "status_codes": statuses,
+        "latency_ms": {},
+    }
+    if latencies:
+        for percentile in PERCENTILES:
+            index = min(len(latencies) - 1, int(len(latencies) * percentile / 100))
+            summary["latency_ms"][f"p{percentile}"] = round(latencies[index] * 1000, 3)
+        summary["latency_ms"]["mean"] = round(
+            sum(latencies) / len(latencies) * 1000, 3
+        )
+        summary["latency_ms"]["max"] = round(latencies[-1] * 1000, 3)
+    return summary
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=GATEWAY_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: dict, baseline: dict) -> str:
+    lines = [
+        f"{'scenario':<14}{'rps':>12}{'Δ':>9}{'p50 ms':>11}{'p99 ms':>11}{'Δ p99':>9}"
+    ]
+    rows = {"total": (report["total"], baseline.get("total", {}))}
+    for name, summary in report["scenarios"].items():
+        rows[name] = (summary, baseline.get("scenarios", {}).get(name, {}))
+    for name, (current, previous) in rows.items():
+        rps = current["throughput_rps"]
+        p50 = current["latency_ms"].get("p50", 0.0)
+        p99 = current["latency_ms"].get("p99", 0.0)
+        lines.append(
+            f"{name:<14}{rps:>12.1f}{_delta(rps, previous.get('throughput_rps')):>9}"
+            f"{p50:>11.2f}{p99:>11.2f}"
+            f"{_delta(p99, previous.get('latency_ms', {}).get('p99')):>9}"
+        )
+    return "\n".join(lines)
+
+
+def _delta(current: float, previous: float | None) -> str:
+    if not previous:
+        return "-"
+    return f"{(current - previous) / previous * 100:+.1f}%"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds measured")
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds discarded")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=1, help="gateway workers")
+    parser.add_argument("--upstream-instances", type=int, default=2)
+    parser.add_argument(
+        "--upstream-latency", type=float, default=0.005, help="stub delay in seconds"
+    )
+    parser.add_argument(
+        "--redis-url", help="use this Redis instead of starting fakeredis"
+    )
+    parser.add_argument("--output", default="load_test_report.json")
+    parser.add_argument("--compare", help="report of a previous run to compare with")
+    parser.add_argument("--verbose", action="store_true", help="show server output")
+    args = parser.parse_args()
+
+    started_at = datetime.now(timezone.utc)
+    with running_stack(args) as base_url:
+        samples = asyncio.run(
+            drive(
+                base_url,
+                args.mix,
+                args.concurrency,
+                args.duration,
+                args.warmup,
+                args.seed,
+            )
+        )
+
+    report = {
+        "commit": git_commit(),
+        "started_at": started_at.isoformat(),
+        "settings": {
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "mix": args.mix,
+            "seed": args.seed,
+            "workers": args.workers,
+            "upstream_instances": args.upstream_instances,
+            "upstream_latency": args.upstream_latency,
+            "redis": "external" if args.redis_url else "fakeredis",
+        },
+        "total": summarize(
+            [sample for values in samples.values() for sample in values],
+            args.duration,
+        ),
+        "scenarios": {
+            name: summarize(values, args.duration) for name, values in samples.items()
+        },
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"Report written to {args.output}")
+
+    baseline = {}
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+    print(compare(report, baseline))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Minimal upstream standing in for currency_service and users_service.
+
+Every response is delayed by ``STUB_LATENCY`` seconds to mimic real work.
+"""
+
+import asyncio
+import os
+
+from fastapi import FastAPI, Request
+
+LATENCY = float(os.getenv("STUB_LATENCY", "0.005"))
+
+CURRENCIES = [
+    {"symbol": f"C{i:03}", "price": round(100 + i * 1.25, 2), "volume": i * 1000}
+    for i in range(100)
+]
+
+app = FastAPI()
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@app.get("/api/v1/currency")
+async def currency():
+    await asyncio.sleep(LATENCY)
+    return CURRENCIES
+
+
+@app.get("/api/v1/quotes/{symbol}")
+async def quote(symbol: str):
+    await asyncio.sleep(LATENCY)
+    return {"symbol": symbol, "price": 101.5}
+
+
+@app.post("/api/v1/orders")
+async def create_order(request: Request):
+    await asyncio.sleep(LATENCY)
+    return {"accepted": True, "size": len(await request.body())}
+
+
+@app.post("/api/v1/verify_token")
+async def verify_token():
+    await asyncio.sleep(LATENCY)
+    return {"valid": True}
@@ -0,0 +1,106 @@
+import asyncio
+
+import httpx
+from starlette.requests import Request
+
+from app.config.config import CacheSettings, ServiceConfig, ServicesConfig
+from app.utils import cache
+from app.utils.cache import get_redis_cache
+from app.utils.cache_entry import CacheEntry
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.local_cache import LocalCache
+from app.utils.single_flight import SingleFlight
+
+
+class StaleRedisRepository:
+    """Holds one entry that is already past its fresh TTL."""
+
+    def __init__(self, entry: CacheEntry, ttl: int):
+        self.values = {}
+        self.entry = entry
+        self.ttl = ttl
+
+    async def get_with_ttl(self, key):
+        return self.entry.dumps(), self.ttl
+
+    async def set(self, key, value, ttl=None):
+        self.values[key] = value
+        return True
+
+
+class ConditionalUpstream:
+    """Answers 304 to conditional requests, like a well-behaved service."""
+
+    def __init__(self):
+        self.headers = []
+
+    async def send(self, service_name, path, method, headers, params):
+        self.headers.append(headers)
+        if "if-none-match" in {name.lower() for name in headers}:
+            return httpx.Response(304)
+        return httpx.Response(
+            200, content=b'{"n": 2}', headers={"content-type": "application/json"}
+        )
+
+
+def make_request(headers: dict[str, str]) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/currency_service/currency",
+            "query_string": b"",
+            "headers": [
+                (name.lower().encode(), value.encode()) for name, value in headers.items()
+            ],
+        }
+    )
+
+
+def test_stale_refresh_ignores_client_conditional_headers():
+    async def run():
+        async def handler(request, service_name, path):
+            raise AssertionError("a stale hit must not call the service")
+
+        stale = CacheEntry.from_body(b'{"n": 1}', "application/json")
+        repository = StaleRedisRepository(stale, ttl=5)
+        upstream = ConditionalUpstream()
+        settings = CacheSettings(
+            breaker_failure_threshold=5,
+            breaker_reset_timeout=10,
+            lock_timeout=0,
+            lock_poll_interval=0.01,
+            stale_ttl=60,
+            compression_level=6,
+        )
+        cached = get_redis_cache(hash_name="gateway", expiration_time=30)(handler)
+        response = await cached(
+            request=make_request(
+                {
+                    "Authorization": "Bearer token",
+                    "If-None-Match": stale.etag,
+                    "Accept-Encoding": "gzip",
+                }
+            ),
+            service_name="currency_service",
+            path="currency",
+            redis_repository=repository,
+            local_cache=LocalCache(max_bytes=1 << 20, max_entries=100, ttl=10),
+            cache_breaker=CircuitBreaker(failure_threshold=5, reset_timeout=10),
+            cache_settings=settings,
+            single_flight=SingleFlight(),
+            refresh_client=upstream,
+            services_config=ServicesConfig(
+                {"currency_service": ServiceConfig(base_url="http://upstream")}
+            ),
+        )
+        await asyncio.gather(*cache._background_tasks)
+        return response, repository, upstream
+
+    response, repository, upstream = asyncio.run(run())
+
+    # The client still gets its 304 for the stale entry it already has.
+    assert response.status_code == 304
+    assert upstream.headers == [{"authorization": "Bearer token"}]
+    [stored] = repository.values.values()
+    assert CacheEntry.loads(stored).body == b'{"n": 2}'
@@ -0,0 +1,135 @@
+import asyncio
+from functools import partial
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.clients import reroute_request_client
+from app.clients.reroute_request_client import (
+    DEFAULT_LIMIT_GROUP,
+    PUBLIC_LIMIT_GROUP,
+    RerouteRequestToServiceClient,
+)
+from app.clients.upstream_registry import UpstreamRegistry
+from app.config.config import (
+    ConcurrencyLimitSettings,
+    HealthCheckSettings,
+    HttpClientSettings,
+    ServiceConfig,
+    ServicesConfig,
+)
+from app.middleware.jwt_auth_middleware import jwt_auth_middleware
+
+SERVICES = ServicesConfig(
+    {
+        "currency_service": ServiceConfig(
+            base_url="http://upstream",
+            prefix="/api/v1",
+            public_endpoints=["rates/*"],
+        )
+    }
+)
+
+
+def make_request(path: str) -> Request:
+    return Request(
+        {"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": []}
+    )
+
+
+def make_client() -> RerouteRequestToServiceClient:
+    return RerouteRequestToServiceClient(
+        config=SERVICES,
+        http_settings=HttpClientSettings(
+            max_connections=10,
+            max_keepalive_connections=10,
+            keepalive_expiry=5,
+            timeout=5,
+            connect_timeout=1,
+            http2=False,
+            stream_responses=False,
+            max_retries=0,
+            retry_budget_ratio=0.1,
+            retry_budget_min=0,
+            breaker_failure_threshold=100,
+            breaker_reset_timeout=10,
+            hedge_percentile=0,
+        ),
+        limit_settings=ConcurrencyLimitSettings(
+            initial_limit=1,
+            min_limit=1,
+            max_limit=1,
+            queue_size=0,
+            queue_timeout=0.1,
+            latency_tolerance=2,
+            auth_max_limit=1,
+            public_max_limit=1,
+            retry_after=1,
+        ),
+        registry=UpstreamRegistry(
+            SERVICES,
+            HealthCheckSettings(
+                interval=5,
+                timeout=1,
+                unhealthy_threshold=2,
+                unhealthy_cooldown=10,
+                balancer="p2c",
+            ),
+        ),
+    )
+
+
+def test_public_endpoints_get_their_own_limit_group():
+    async def run():
+        seen = {}
+
+        async def call_next(request):
+            seen[request.url.path] = getattr(request.state, "limit_group", None)
+
+        for path in ("/currency_service/rates/btc", "/users_service/login"):
+            await jwt_auth_middleware(
+                make_request(path), call_next, services_config=SERVICES
+            )
+        return seen
+
+    assert asyncio.run(run()) == {
+        "/currency_service/rates/btc": PUBLIC_LIMIT_GROUP,
+        "/users_service/login": "auth",
+    }
+
+
+def test_saturated_api_limit_does_not_shed_public_requests(monkeypatch):
+    release = asyncio.Event()
+
+    async def upstream(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/api/v1/slow":
+            await release.wait()
+        return httpx.Response(200, json={"path": request.url.path})
+
+    monkeypatch.setattr(
+        reroute_request_client.httpx,
+        "AsyncClient",
+        partial(httpx.AsyncClient, transport=httpx.MockTransport(upstream)),
+    )
+
+    async def run():
+        client = make_client()
+        send = partial(client.send, "currency_service", method="GET", headers={})
+        # The only "api" slot is held by a slow call.
+        slow = asyncio.create_task(send(path="slow", limit_group=DEFAULT_LIMIT_GROUP))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(HTTPException) as shed:
+            await send(path="currency", limit_group=DEFAULT_LIMIT_GROUP)
+        public = await send(path="rates/btc", limit_group=PUBLIC_LIMIT_GROUP)
+
+        release.set()
+        await slow
+        await client.aclose()
+        return shed.value, public
+
+    shed, public = asyncio.run(run())
+    assert shed.status_code == 503
+    assert public.status_code == 200
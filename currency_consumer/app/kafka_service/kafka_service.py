@@ -1,8 +1,8 @@
-import json
 import logging
 
 from aiokafka import AIOKafkaConsumer
 
+from app import json_codec, ticker_codec
 from app.config import KafkaConfig
 
 logger = logging.getLogger(__name__)
@@ -23,11 +23,19 @@ class KafkaService:
         await consumer.start()
         try:
             async for message in consumer:
-                if json.loads(message.value).get("Message") == "Heartbeat":
+                if ticker_codec.is_binary(message.value):
+                    try:
+                        yield ticker_codec.decode(message.value)
+                    except ValueError as e:
+                        logger.error("Не удалось декодировать тикер: %s", e)
+                    await consumer.commit()
+                    continue
+                event = json_codec.loads(message.value)
+                if event.get("Message") == "Heartbeat":
                     logging.info("Получено heartbeat сообщение")
                     await consumer.commit()
                     continue
-                yield json.loads(message.value)
+                yield event
 
                 await consumer.commit()
         finally:
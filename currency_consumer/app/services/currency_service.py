@@ -1,8 +1,10 @@
 from datetime import datetime
 
 
+from app import ticker_codec
 from app.kafka_service.kafka_service import KafkaService
 from app.repositories.currency_repository import CurrencyRepository
+from app.ticker_codec import Ticker
 
 
 class CurrencyService:
@@ -15,42 +17,33 @@ class CurrencyService:
         self.current_batch = []
 
     async def process_ticker_stream(self):
-        async for raw_message in self.kafka_service.consume_message():
+        async for message in self.kafka_service.consume_message():
             try:
-                message = raw_message
-                if message.get("stream", "").endswith("@ticker"):
-                    ticker_data = self._transform_ticker_data(message["data"])
-                    self.current_batch.append(ticker_data)
-
-                    if len(self.current_batch) >= self.batch_size:
-                        await self._flush_batch()
+                # Binary tickers arrive decoded, JSON events are still accepted.
+                if isinstance(message, Ticker):
+                    ticker = message
+                elif message.get("stream", "").endswith("@ticker"):
+                    ticker = ticker_codec.from_binance(message["data"])
+                else:
+                    continue
+                self.current_batch.append(self._transform_ticker_data(ticker))
+
+                if len(self.current_batch) >= self.batch_size:
+                    await self._flush_batch()
             except Exception as e:
                 print(f"Error processing message: {e}")
 
     @staticmethod
-    def _transform_ticker_data(data: dict) -> dict:
-        def strip_microseconds(dt: datetime) -> str:
+    def _transform_ticker_data(ticker: Ticker) -> dict:
+        def strip_microseconds(timestamp_ms: int) -> str:
+            dt = datetime.fromtimestamp(timestamp_ms / 1000)
             return dt.replace(microsecond=0).isoformat(sep=" ")
 
-        return {
-            "symbol": data["s"],
-            "event_time": strip_microseconds(datetime.fromtimestamp(data["E"] / 1000)),
-            "price_change": float(data["p"]),
-            "price_change_percent": float(data["P"]),
-            "weighted_avg_price": float(data["w"]),
-            "last_price": float(data["c"]),
-            "last_quantity": float(data["Q"]),
-            "open_price": float(data["o"]),
-            "high_price": float(data["h"]),
-            "low_price": float(data["l"]),
-            "total_traded_volume": float(data["v"]),
-            "total_traded_quote_volume": float(data["q"]),
-            "open_time": strip_microseconds(datetime.fromtimestamp(data["O"] / 1000)),
-            "close_time": strip_microseconds(datetime.fromtimestamp(data["C"] / 1000)),
-            "first_trade_id": data["F"],
-            "last_trade_id": data["L"],
-            "total_trades": data["n"],
-        }
+        row = ticker._asdict()
+        row["event_time"] = strip_microseconds(ticker.event_time)
+        row["open_time"] = strip_microseconds(ticker.open_time)
+        row["close_time"] = strip_microseconds(ticker.close_time)
+        return row
 
     async def _flush_batch(self):
         if not self.current_batch:
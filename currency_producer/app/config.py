@@ -7,10 +7,67 @@ from typing import Self
 class KafkaConfig:
     kafka_topic: str
     brokers: str
+    compression_type: str = "lz4"
+    linger_ms: int = 20
+    max_batch_size: int = 128 * 1024
+    request_timeout_ms: int = 40_000
+    queue_size: int = 10_000
+    overflow_policy: str = "drop_oldest"
+    drain_timeout: float = 5.0
+    # Only applies to the json wire format, binary tickers are always
+    # parsed to be encoded. Stay on json until every consumer reads binary.
+    raw_passthrough: bool = True
+    wire_format: str = "json"
+    conflation_window: float = 0.0
 
     @classmethod
     def provide(cls) -> Self:
         return cls(
             kafka_topic=os.environ.get("KAFKA_TOPIC"),
             brokers=os.environ.get("BROKERS"),
+            compression_type=os.environ.get("KAFKA_COMPRESSION_TYPE", "lz4"),
+            linger_ms=int(os.environ.get("KAFKA_LINGER_MS", 20)),
+            max_batch_size=int(os.environ.get("KAFKA_MAX_BATCH_SIZE", 128 * 1024)),
+            request_timeout_ms=int(os.environ.get("KAFKA_REQUEST_TIMEOUT_MS", 40_000)),
+            queue_size=int(os.environ.get("PRODUCER_QUEUE_SIZE", 10_000)),
+            overflow_policy=os.environ.get("PRODUCER_OVERFLOW_POLICY", "drop_oldest"),
+            drain_timeout=float(os.environ.get("PRODUCER_DRAIN_TIMEOUT", 5.0)),
+            raw_passthrough=os.environ.get("PRODUCER_RAW_PASSTHROUGH", "true").lower()
+            in ("1", "true", "yes"),
+            wire_format=os.environ.get("PRODUCER_WIRE_FORMAT", "json"),
+            conflation_window=float(os.environ.get("PRODUCER_CONFLATION_WINDOW", 0.0)),
+        )
+
+
+DEFAULT_SYMBOLS = (
+    "BTCUSDT",
+    "ETHUSDT",
+    "WBTCUSDT",
+    "BNBUSDT",
+    "DEFIUSDT",
+    "BCHUSDT",
+)
+
+
+@dataclass
+class StreamConfig:
+    symbols: list[str]
+    base_url: str = "wss://fstream.binance.com"
+    streams_per_connection: int = 100
+    workers: int = 1
+    reconnect_min_delay: float = 1.0
+    reconnect_max_delay: float = 30.0
+    metrics_port: int = 9108
+
+    @classmethod
+    def provide(cls) -> Self:
+        symbols = os.environ.get("SYMBOLS", ",".join(DEFAULT_SYMBOLS))
+        return cls(
+            symbols=[symbol.strip().upper() for symbol in symbols.split(",") if symbol.strip()],
+            base_url=os.environ.get("WS_BASE_URL", "wss://fstream.binance.com"),
+            streams_per_connection=int(os.environ.get("WS_STREAMS_PER_CONNECTION", 100)),
+            workers=int(os.environ.get("PRODUCER_WORKERS", 1)),
+            reconnect_min_delay=float(os.environ.get("WS_RECONNECT_MIN_DELAY", 1.0)),
+            reconnect_max_delay=float(os.environ.get("WS_RECONNECT_MAX_DELAY", 30.0)),
+            metrics_port=int(os.environ.get("METRICS_PORT", 9108)),
         )
@@ -0,0 +1,61 @@
+import asyncio
+import logging
+from typing import Any
+
+from metrics import CONFLATED, CONFLATION_PENDING
+from send_queue import SendQueue
+
+logger = logging.getLogger(__name__)
+
+
+class Conflator:
+    """Keeps only the latest message per key for a window, then enqueues it.
+
+    Analytics only needs the last ticker of every symbol, so the updates
+    that arrive for a symbol within ``window`` seconds replace each other
+    and only the last one reaches the send queue. Memory and Kafka volume
+    are bounded by the number of symbols per window however fast the
+    exchange sends. Messages without a key are enqueued right away.
+    """
+
+    def __init__(self, window: float, queue: SendQueue) -> None:
+        self.window = window
+        self.queue = queue
+        self.conflated = 0
+        self.__pending: dict[str, tuple[Any, list | None]] = {}
+        self.__flusher: asyncio.Task | None = None
+        CONFLATION_PENDING.set_function(lambda: len(self.__pending))
+
+    async def put(
+        self, key: str | None, message: Any, headers: list | None = None
+    ) -> None:
+        if key is None:
+            await self.queue.put(key, message, headers)
+            return
+        if key in self.__pending:
+            self.conflated += 1
+            CONFLATED.inc()
+        self.__pending[key] = (message, headers)
+
+    def start(self) -> None:
+        self.__flusher = asyncio.create_task(self.__flush_loop())
+
+    async def stop(self) -> None:
+        if self.__flusher is not None:
+            self.__flusher.cancel()
+            try:
+                await self.__flusher
+            except asyncio.CancelledError:
+                pass
+        # What is still pending is the latest state, it must not be lost.
+        await self.flush()
+
+    async def flush(self) -> None:
+        pending, self.__pending = self.__pending, {}
+        for key, (message, headers) in pending.items():
+            await self.queue.put(key, message, headers)
+
+    async def __flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.window)
+            await self.flush()
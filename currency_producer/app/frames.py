@@ -0,0 +1,28 @@
+import re
+
+# Binance combined-stream frames look like
+# {"stream":"btcusdt@ticker","data":{"e":"24hrTicker","E":...,"s":"BTCUSDT",...}}
+# and all the fields read here sit at the start of the frame.
+HEAD_SIZE = 256
+STREAM = re.compile(rb'"stream"\s*:\s*"([^"]+)"')
+SYMBOL = re.compile(rb'"s"\s*:\s*"([^"]+)"')
+EVENT_TIME = re.compile(rb'"E"\s*:\s*(\d+)')
+
+
+def peek_frame(frame: bytes) -> tuple[str | None, str | None, int | None]:
+    """Return the stream name, symbol and event time (ms) of a frame.
+
+    Only the head of the frame is scanned, the frame isn't parsed. When the
+    symbol isn't found there it is derived from the stream name.
+    """
+    head = frame[:HEAD_SIZE]
+    stream = STREAM.search(head)
+    symbol = SYMBOL.search(head)
+    event_time = EVENT_TIME.search(head)
+    stream_name = stream.group(1).decode() if stream else None
+    event_time_ms = int(event_time.group(1)) if event_time else None
+    if symbol:
+        return stream_name, symbol.group(1).decode(), event_time_ms
+    if stream_name:
+        return stream_name, stream_name.partition("@")[0].upper(), event_time_ms
+    return None, None, event_time_ms
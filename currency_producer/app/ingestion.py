@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import random
+import time
+
+import websockets
+
+import json_codec
+import ticker_codec
+from config import StreamConfig
+from frames import peek_frame
+from kafka_service import KafkaService
+from metrics import WS_CONNECTED, WS_INVALID, WS_LAG, WS_MESSAGES, WS_RECONNECTS
+
+logger = logging.getLogger(__name__)
+
+WIRE_BINARY = "binary"
+WIRE_JSON = "json"
+
+WIRE_FORMATS = (WIRE_BINARY, WIRE_JSON)
+
+
+def shard_streams(symbols: list[str], streams_per_connection: int) -> list[list[str]]:
+    """Split the ticker streams of the symbols into per-connection groups."""
+    streams = list(dict.fromkeys(f"{symbol.lower()}@ticker" for symbol in symbols))
+    size = max(1, streams_per_connection)
+    return [streams[start : start + size] for start in range(0, len(streams), size)]
+
+
+class StreamShard:
+    """One combined-stream websocket connection feeding the Kafka producer.
+
+    The connection is reopened with exponential backoff and jitter whenever
+    it fails or the exchange closes it, and the same streams are subscribed
+    again. Frames sent while the shard was disconnected are lost, the next
+    ticker of each symbol supersedes them.
+
+    The json wire format forwards the exchange's frames, unparsed with
+    ``raw_passthrough``. The binary format parses every frame and sends
+    ticker events in the compact ``ticker_codec`` encoding, other events
+    keep their JSON; ``raw_passthrough`` doesn't apply to it.
+    """
+
+    def __init__(
+        self,
+        index: int,
+        streams: list[str],
+        stream_config: StreamConfig,
+        kafka_service: KafkaService,
+        raw_passthrough: bool = True,
+        wire_format: str = WIRE_JSON,
+    ) -> None:
+        if wire_format not in WIRE_FORMATS:
+            raise ValueError(f"Unknown wire format: {wire_format}")
+        self.index = index
+        self.streams = streams
+        self.stream_config = stream_config
+        self.kafka_service = kafka_service
+        self.raw_passthrough = raw_passthrough
+        self.wire_format = wire_format
+        shard = str(index)
+        self.__messages = WS_MESSAGES.labels(shard)
+        self.__invalid = WS_INVALID.labels(shard)
+        self.__lag = WS_LAG.labels(shard)
+        self.__connected = WS_CONNECTED.labels(shard)
+        self.__reconnects = WS_RECONNECTS.labels(shard)
+
+    @property
+    def url(self) -> str:
+        base_url = self.stream_config.base_url.rstrip("/")
+        return f"{base_url}/stream?streams={'/'.join(self.streams)}"
+
+    async def run(self) -> None:
+        attempt = 0
+        while True:
+            try:
+                async with websockets.connect(self.url) as ws:
+                    attempt = 0
+                    self.__connected.set(1)
+                    logger.info(
+                        "Shard %d подключен, streams=%d", self.index, len(self.streams)
+                    )
+                    await self.__consume(ws)
+            except asyncio.CancelledError:
+                raise
+            except (OSError, asyncio.TimeoutError, websockets.WebSocketException) as e:
+                logger.warning("Shard %d отключен error=%r", self.index, e)
+            finally:
+                self.__connected.set(0)
+
+            delay = min(
+                self.stream_config.reconnect_max_delay,
+                self.stream_config.reconnect_min_delay * 2**attempt,
+            )
+            attempt += 1
+            self.__reconnects.inc()
+            await asyncio.sleep(random.uniform(delay / 2, delay))
+
+    async def __consume(self, ws) -> None:
+        while True:
+            frame = await ws.recv(decode=False)
+            try:
+                event_time = await self.__send(frame)
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                # A malformed frame is skipped, it must not end the shard.
+                self.__invalid.inc()
+                logger.warning(
+                    "Shard %d пропустил некорректный кадр error=%r frame=%r",
+                    self.index,
+                    e,
+                    frame[:200],
+                )
+                continue
+            self.__messages.inc()
+            if event_time:
+                self.__lag.set(time.time() - event_time / 1000)
+
+    async def __send(self, frame: bytes) -> int | None:
+        if self.wire_format == WIRE_BINARY:
+            return await self.__send_binary(frame)
+        if self.raw_passthrough:
+            # The frame is forwarded byte for byte, only the stream name,
+            # symbol and event time are read from it.
+            stream, symbol, event_time = peek_frame(frame)
+            headers = [("stream", stream.encode())] if stream else None
+            await self.kafka_service.send_message(frame, key=symbol, headers=headers)
+            return event_time
+        event = json_codec.loads(frame)
+        data = event.get("data", {})
+        await self.kafka_service.send_message(event, key=data.get("s"))
+        return data.get("E")
+
+    async def __send_binary(self, frame: bytes) -> int | None:
+        event = json_codec.loads(frame)
+        data = event.get("data", {})
+        value = frame
+        if data.get("e") == "24hrTicker":
+            value = ticker_codec.encode(ticker_codec.from_binance(data))
+        stream = event.get("stream")
+        headers = [("stream", stream.encode())] if stream else None
+        await self.kafka_service.send_message(value, key=data.get("s"), headers=headers)
+        return data.get("E")
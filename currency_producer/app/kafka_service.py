@@ -0,0 +1,147 @@
+import asyncio
+import logging
+from typing import Any, Self
+
+from aiokafka import AIOKafkaProducer
+from aiokafka.errors import KafkaTimeoutError
+
+import json_codec
+from config import KafkaConfig
+from conflation import Conflator
+from metrics import KAFKA_FAILED, QUEUE_SIZE
+from send_queue import SendQueue
+
+logger = logging.getLogger(__name__)
+
+
+def serialize_value(value: dict[str, Any] | bytes) -> bytes:
+    # Forwarded frames and binary tickers are already encoded.
+    if isinstance(value, bytes):
+        return value
+    return json_codec.dumps(value)
+
+
+class KafkaService:
+    """Produces messages from a bounded queue in the background.
+
+    ``send_message`` only enqueues, so a slow or unavailable broker never
+    stalls the websocket reader. The producer batches messages per
+    partition for ``linger_ms`` and compresses the batches; messages are
+    keyed by symbol so that every symbol stays ordered in one partition.
+
+    With a conflation window only the latest message per symbol within the
+    window is enqueued, see ``Conflator``.
+    """
+
+    def __init__(self, kafka_config: KafkaConfig) -> None:
+        self.kafka_config = kafka_config
+        self.producer = AIOKafkaProducer(
+            bootstrap_servers=self.kafka_config.brokers,
+            key_serializer=lambda key: key.encode("utf-8") if key else None,
+            value_serializer=serialize_value,
+            compression_type=self.kafka_config.compression_type,
+            linger_ms=self.kafka_config.linger_ms,
+            max_batch_size=self.kafka_config.max_batch_size,
+            request_timeout_ms=self.kafka_config.request_timeout_ms,
+        )
+        self.queue = SendQueue(
+            self.kafka_config.queue_size, self.kafka_config.overflow_policy
+        )
+        self.conflator = (
+            Conflator(self.kafka_config.conflation_window, self.queue)
+            if self.kafka_config.conflation_window > 0
+            else None
+        )
+        self.failed = 0
+        QUEUE_SIZE.set_function(self.queue.qsize)
+        self.__sender: asyncio.Task | None = None
+
+    async def send_message(
+        self,
+        message: dict[str, Any] | bytes,
+        key: str | None = None,
+        headers: list[tuple[str, bytes]] | None = None,
+    ) -> None:
+        if self.conflator is not None:
+            await self.conflator.put(key, message, headers)
+        else:
+            await self.queue.put(key, message, headers)
+
+    async def start(self) -> None:
+        await self.producer.start()
+        self.__sender = asyncio.create_task(self.__send_loop())
+        if self.conflator is not None:
+            self.conflator.start()
+        logger.info("Kafka producer успешно запущен")
+
+    async def stop(self) -> None:
+        if self.conflator is not None:
+            await self.conflator.stop()
+        try:
+            await asyncio.wait_for(self.queue.join(), self.kafka_config.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Не удалось отправить %d сообщений до остановки", self.queue.qsize()
+            )
+        if self.__sender is not None:
+            self.__sender.cancel()
+            try:
+                await self.__sender
+            except asyncio.CancelledError:
+                pass
+        # Flushes the batches that are still being lingered on.
+        await self.producer.stop()
+        logger.info(
+            "Kafka producer успешно остановлен, dropped=%d conflated=%d failed=%d",
+            self.queue.dropped,
+            self.conflator.conflated if self.conflator is not None else 0,
+            self.failed,
+        )
+
+    async def __send_loop(self) -> None:
+        while True:
+            key, message, headers = await self.queue.get()
+            try:
+                await self.__send(key, message, headers)
+            finally:
+                self.queue.task_done()
+
+    async def __send(
+        self,
+        key: str | None,
+        message: dict[str, Any] | bytes,
+        headers: list[tuple[str, bytes]] | None,
+    ) -> None:
+        while True:
+            try:
+                # Returns once the message is in a batch, delivery is
+                # reported to the callback.
+                delivery = await self.producer.send(
+                    self.kafka_config.kafka_topic, value=message, key=key, headers=headers
+                )
+            except KafkaTimeoutError:
+                # The producer's buffer stayed full while the broker was
+                # unavailable, keep the message and try again.
+                logger.warning("Kafka недоступна, повторная отправка key=%s", key)
+                continue
+            except Exception:
+                self.failed += 1
+                KAFKA_FAILED.inc()
+                logger.exception("Не удалось отправить сообщение key=%s", key)
+                return
+            delivery.add_done_callback(self.__on_delivery)
+            return
+
+    def __on_delivery(self, delivery: asyncio.Future) -> None:
+        if delivery.cancelled() or delivery.exception() is None:
+            return
+        self.failed += 1
+        KAFKA_FAILED.inc()
+        logger.error("Сообщение не доставлено в Kafka error=%s", delivery.exception())
+
+    async def __aenter__(self) -> Self:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        await self.stop()
@@ -1,67 +1,118 @@
 import asyncio
-import json
 import logging
-from typing import Any, Self
-import websockets
+import multiprocessing
+import os
+import signal
+from multiprocessing.connection import wait
 
-from aiokafka import AIOKafkaProducer
+from prometheus_client import start_http_server
 
-from config import KafkaConfig
+from config import KafkaConfig, StreamConfig
+from ingestion import StreamShard, shard_streams
+from kafka_service import KafkaService
 
 logger = logging.getLogger(__name__)
 
 
-class KafkaService:
-
-    def __init__(self, kafka_config: KafkaConfig) -> None:
-        self.kafka_config = kafka_config
-        self.producer = AIOKafkaProducer(
-            bootstrap_servers=self.kafka_config.brokers,
-            value_serializer=lambda m: json.dumps(m).encode("utf-8"),
+async def run_worker(
+    worker_index: int,
+    workers: int,
+    stream_config: StreamConfig,
+    kafka_config: KafkaConfig,
+) -> None:
+    """Run the shards assigned to this worker until SIGTERM or SIGINT."""
+    shards = [
+        (index, streams)
+        for index, streams in enumerate(
+            shard_streams(stream_config.symbols, stream_config.streams_per_connection)
         )
-
-    async def send_message(self, message: dict[str, Any]) -> None:
-        await self.producer.send(self.kafka_config.kafka_topic, value=message)
-
-    async def start(self) -> None:
-        await self.producer.start()
-        logger.info("Kafka producer успешно запущен")
-
-    async def stop(self) -> None:
-        await self.producer.stop()
-        logger.info("Kafka producer успешно остановлен")
-
-    async def __aenter__(self) -> Self:
-        await self.start()
-        return self
-
-    async def __aexit__(self, *_: object) -> None:
-        await self.stop()
-
-
-async def websocket_client(symbols: list[str]):
-    streams = [f"{symbol.lower()}@ticker" for symbol in symbols]
-    streams_str = "/".join(streams)
-    url = f"wss://fstream.binance.com/stream?streams={streams_str}"
-    async with KafkaService(KafkaConfig.provide()) as kafka_service:
-        async with websockets.connect(url) as ws:
-            while True:
-                response = await ws.recv()
-                event = json.loads(response)
-                await kafka_service.send_message(event)
-
-
-async def main():
-    symbols = [
-        "BTCUSDT",
-        "ETHUSDT",
-        "WBTCUSDT",
-        "BNBUSDT",
-        "DEFIUSDT",
-        "BCHUSDT",
+        if index % workers == worker_index
+    ]
+    if stream_config.metrics_port:
+        # Every worker exposes its own metrics on the next port.
+        start_http_server(stream_config.metrics_port + worker_index)
+
+    loop = asyncio.get_running_loop()
+    task = asyncio.current_task()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, task.cancel)
+
+    logger.info(
+        "Worker %d запущен, shards=%s", worker_index, [index for index, _ in shards]
+    )
+    async with KafkaService(kafka_config) as kafka_service:
+        try:
+            await asyncio.gather(
+                *(
+                    StreamShard(
+                        index,
+                        streams,
+                        stream_config,
+                        kafka_service,
+                        raw_passthrough=kafka_config.raw_passthrough,
+                        wire_format=kafka_config.wire_format,
+                    ).run()
+                    for index, streams in shards
+                )
+            )
+        except asyncio.CancelledError:
+            # The queue is drained when the Kafka service stops.
+            logger.info("Worker %d останавливается", worker_index)
+
+
+def worker_main(worker_index: int, workers: int) -> None:
+    configure_logging()
+    asyncio.run(
+        run_worker(worker_index, workers, StreamConfig.provide(), KafkaConfig.provide())
+    )
+
+
+def run_workers(count: int) -> None:
+    """Run the workers as processes; when one exits the others are stopped too."""
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(
+            target=worker_main, args=(index, count), name=f"producer-{index}"
+        )
+        for index in range(count)
     ]
-    await websocket_client(symbols)
+    for process in processes:
+        process.start()
+    signal.signal(signal.SIGTERM, lambda *_: _terminate(processes))
+
+    wait([process.sentinel for process in processes])
+    _terminate(processes)
+    for process in processes:
+        process.join()
+    failed = [process.name for process in processes if process.exitcode]
+    if failed:
+        raise SystemExit(f"Workers failed: {', '.join(failed)}")
+
+
+def _terminate(processes: list[multiprocessing.Process]) -> None:
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+
+def configure_logging() -> None:
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO").upper(),
+        format="%(asctime)s level=%(levelname)s logger=%(name)s %(message)s",
+    )
+
+
+def main() -> None:
+    stream_config = StreamConfig.provide()
+    shards = shard_streams(stream_config.symbols, stream_config.streams_per_connection)
+    # A worker without shards would have nothing to do.
+    workers = max(1, min(stream_config.workers, len(shards)))
+    if workers > 1:
+        configure_logging()
+        run_workers(workers)
+    else:
+        worker_main(0, 1)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
@@ -0,0 +1,47 @@
+from prometheus_client import Counter, Gauge
+
+WS_MESSAGES = Counter(
+    "producer_ws_messages_total",
+    "Frames received from the exchange, by shard.",
+    ["shard"],
+)
+WS_INVALID = Counter(
+    "producer_ws_invalid_frames_total",
+    "Frames skipped because they could not be parsed, by shard.",
+    ["shard"],
+)
+WS_LAG = Gauge(
+    "producer_ws_lag_seconds",
+    "Time between the event and its arrival for the last frame of a shard.",
+    ["shard"],
+)
+WS_CONNECTED = Gauge(
+    "producer_ws_connected",
+    "Whether the shard's websocket connection is open.",
+    ["shard"],
+)
+WS_RECONNECTS = Counter(
+    "producer_ws_reconnects_total",
+    "Websocket reconnects, by shard.",
+    ["shard"],
+)
+QUEUE_SIZE = Gauge(
+    "producer_queue_size",
+    "Messages waiting to be handed to the Kafka producer.",
+)
+QUEUE_DROPPED = Counter(
+    "producer_queue_dropped_total",
+    "Messages dropped because the send queue was full.",
+)
+CONFLATED = Counter(
+    "producer_conflated_total",
+    "Ticker updates replaced by a newer one of the same symbol before sending.",
+)
+CONFLATION_PENDING = Gauge(
+    "producer_conflation_pending",
+    "Symbols with an update waiting for the end of the conflation window.",
+)
+KAFKA_FAILED = Counter(
+    "producer_kafka_failed_total",
+    "Messages that could not be delivered to Kafka.",
+)
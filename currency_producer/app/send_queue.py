@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from typing import Any
+
+from metrics import QUEUE_DROPPED
+
+logger = logging.getLogger(__name__)
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+BLOCK = "block"
+
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+# Drops are logged once and then every this many times.
+DROP_LOG_EVERY = 1000
+
+
+class SendQueue:
+    """Bounded buffer between the websocket reader and the Kafka producer.
+
+    The reader only waits for the queue, never for the broker. What happens
+    when the queue is full depends on the overflow policy:
+
+    drop_oldest  the symbol's latest pending message is replaced by the
+                 incoming one, which supersedes it; when the symbol has
+                 nothing pending the oldest message of any symbol is
+                 discarded
+    drop_newest  the incoming message is discarded
+    block        the reader waits; the exchange may drop a connection that
+                 is read too slowly
+    """
+
+    def __init__(self, maxsize: int, overflow_policy: str = DROP_OLDEST) -> None:
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+        self.overflow_policy = overflow_policy
+        self.dropped = 0
+        self.__queue: asyncio.Queue[list] = asyncio.Queue(maxsize)
+        # The newest queued item of every key, items are mutable lists so
+        # that an overflow can replace the message in place.
+        self.__latest: dict[str, list] = {}
+
+    def qsize(self) -> int:
+        return self.__queue.qsize()
+
+    async def put(
+        self, key: str | None, message: Any, headers: list | None = None
+    ) -> None:
+        item = [key, message, headers]
+        if self.overflow_policy == BLOCK:
+            await self.__queue.put(item)
+            self.__track(item)
+            return
+        try:
+            self.__queue.put_nowait(item)
+            self.__track(item)
+            return
+        except asyncio.QueueFull:
+            pass
+        if self.overflow_policy == DROP_OLDEST:
+            latest = self.__latest.get(key) if key is not None else None
+            if latest is not None:
+                latest[1], latest[2] = message, headers
+            else:
+                self.__untrack(self.__queue.get_nowait())
+                self.__queue.task_done()
+                self.__queue.put_nowait(item)
+                self.__track(item)
+        self.dropped += 1
+        QUEUE_DROPPED.inc()
+        if self.dropped == 1 or self.dropped % DROP_LOG_EVERY == 0:
+            logger.warning(
+                "Очередь отправки переполнена, policy=%s dropped=%d",
+                self.overflow_policy,
+                self.dropped,
+            )
+
+    async def get(self) -> tuple[str | None, Any, list | None]:
+        item = await self.__queue.get()
+        self.__untrack(item)
+        return tuple(item)
+
+    def task_done(self) -> None:
+        self.__queue.task_done()
+
+    async def join(self) -> None:
+        await self.__queue.join()
+
+    def __track(self, item: list) -> None:
+        if item[0] is not None:
+            self.__latest[item[0]] = item
+
+    def __untrack(self, item: list) -> None:
+        if item[0] is not None and self.__latest.get(item[0]) is item:
+            del self.__latest[item[0]]
@@ -0,0 +1,98 @@
+"""Compact binary encoding of 24hr ticker events, shared by producer and consumer.
+
+Version 1 layout, big-endian, 132 bytes plus the symbol:
+
+    magic          2s   b"TK"
+    version        B    1
+    E O C          3q   event, open and close time in ms
+    F L n          3q   first and last trade id, number of trades
+    p P w c Q      5d   price change and percent, weighted average price,
+                        last price and quantity
+    o h l v q      5d   open, high and low price, base and quote volume
+    symbol length  B    followed by the symbol in ASCII
+
+Anything that doesn't start with the magic is JSON, which both sides keep
+accepting for debugging and during upgrades.
+
+The producer and consumer are built from separate Docker contexts, so this
+module is copied into both. ``scripts/check_copies.py`` checks they match.
+"""
+
+import struct
+from typing import Any, NamedTuple
+
+MAGIC = b"TK"
+VERSION = 1
+
+_HEADER = struct.Struct(">2sB")
+_V1 = struct.Struct(">2sB6q10dB")
+
+
+class Ticker(NamedTuple):
+    symbol: str
+    event_time: int
+    open_time: int
+    close_time: int
+    first_trade_id: int
+    last_trade_id: int
+    total_trades: int
+    price_change: float
+    price_change_percent: float
+    weighted_avg_price: float
+    last_price: float
+    last_quantity: float
+    open_price: float
+    high_price: float
+    low_price: float
+    total_traded_volume: float
+    total_traded_quote_volume: float
+
+
+def from_binance(data: dict[str, Any]) -> Ticker:
+    """Build a ticker from the ``data`` of a Binance 24hrTicker event."""
+    return Ticker(
+        symbol=data["s"],
+        event_time=data["E"],
+        open_time=data["O"],
+        close_time=data["C"],
+        first_trade_id=data["F"],
+        last_trade_id=data["L"],
+        total_trades=data["n"],
+        price_change=float(data["p"]),
+        price_change_percent=float(data["P"]),
+        weighted_avg_price=float(data["w"]),
+        last_price=float(data["c"]),
+        last_quantity=float(data["Q"]),
+        open_price=float(data["o"]),
+        high_price=float(data["h"]),
+        low_price=float(data["l"]),
+        total_traded_volume=float(data["v"]),
+        total_traded_quote_volume=float(data["q"]),
+    )
+
+
+def is_binary(payload: bytes) -> bool:
+    return payload[:2] == MAGIC
+
+
+def encode(ticker: Ticker) -> bytes:
+    symbol = ticker.symbol.encode("ascii")
+    return _V1.pack(MAGIC, VERSION, *ticker[1:], len(symbol)) + symbol
+
+
+def decode(payload: bytes) -> Ticker:
+    """Decode a binary ticker, any malformed payload raises ValueError."""
+    if len(payload) < _HEADER.size:
+        raise ValueError("Truncated ticker")
+    magic, version = _HEADER.unpack_from(payload)
+    if magic != MAGIC:
+        raise ValueError("Not a binary ticker")
+    if version != VERSION:
+        raise ValueError(f"Unsupported ticker version: {version}")
+    if len(payload) < _V1.size:
+        raise ValueError("Truncated ticker")
+    *values, symbol_length = _V1.unpack_from(payload)
+    if len(payload) < _V1.size + symbol_length:
+        raise ValueError("Truncated ticker")
+    symbol = payload[_V1.size : _V1.size + symbol_length].decode("ascii")
+    return Ticker(symbol, *values[2:])
@@ -0,0 +1,112 @@
+"""Local stand-in for the Binance combined-stream websocket API.
+
+Serves ``/stream?streams=btcusdt@ticker/...`` and sends one 24hr ticker frame
+per stream every ``--interval`` seconds. Connections can be dropped
+periodically to exercise reconnects::
+
+    python stub_exchange.py --port 9443 --drop-after 30
+    WS_BASE_URL=ws://127.0.0.1:9443 SYMBOLS=... python app/main.py
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import parse_qs, urlparse
+
+from websockets.asyncio.server import ServerConnection, serve
+from websockets.http11 import Request
+
+
+def ticker_frame(stream: str) -> str:
+    symbol = stream.partition("@")[0].upper()
+    now = int(time.time() * 1000)
+    price = random.uniform(10, 100_000)
+    return json.dumps(
+        {
+            "stream": stream,
+            "data": {
+                "e": "24hrTicker",
+                "E": now,
+                "s": symbol,
+                "p": f"{random.uniform(-50, 50):.2f}",
+                "P": f"{random.uniform(-3, 3):.3f}",
+                "w": f"{price:.2f}",
+                "c": f"{price:.2f}",
+                "Q": f"{random.uniform(0, 5):.3f}",
+                "o": f"{price * 0.99:.2f}",
+                "h": f"{price * 1.02:.2f}",
+                "l": f"{price * 0.97:.2f}",
+                "v": f"{random.uniform(0, 1e6):.3f}",
+                "q": f"{random.uniform(0, 1e9):.2f}",
+                "O": now - 86_400_000,
+                "C": now,
+                "F": 1,
+                "L": 1000,
+                "n": 1000,
+            },
+        },
+        separators=(",", ":"),
+    )
+
+
+def streams_of(path: str) -> list[str]:
+    query = parse_qs(urlparse(path).query)
+    return [stream for stream in query.get("streams", [""])[0].split("/") if stream]
+
+
+def build_handlers(args: argparse.Namespace):
+    def process_request(connection: ServerConnection, request: Request):
+        streams = streams_of(request.path)
+        if not urlparse(request.path).path.startswith("/stream") or not streams:
+            return connection.respond(404, "Unknown stream\n")
+        if len(streams) > args.max_streams:
+            return connection.respond(400, "Too many streams\n")
+        return None
+
+    async def handler(connection: ServerConnection):
+        streams = streams_of(connection.request.path)
+        drop_at = None
+        if args.drop_after:
+            drop_at = time.monotonic() + random.uniform(
+                args.drop_after / 2, args.drop_after
+            )
+        while True:
+            for stream in streams:
+                await connection.send(ticker_frame(stream))
+            if drop_at is not None and time.monotonic() >= drop_at:
+                # Like a network failure: no closing handshake.
+                connection.transport.abort()
+                return
+            await asyncio.sleep(args.interval)
+
+    return process_request, handler
+
+
+async def run(args: argparse.Namespace) -> None:
+    process_request, handler = build_handlers(args)
+    async with serve(handler, args.host, args.port, process_request=process_request):
+        print(f"Stub exchange listening on ws://{args.host}:{args.port}")
+        await asyncio.Future()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9443)
+    parser.add_argument(
+        "--interval", type=float, default=1.0, help="seconds between ticker frames"
+    )
+    parser.add_argument("--max-streams", type=int, default=200)
+    parser.add_argument(
+        "--drop-after",
+        type=float,
+        default=0.0,
+        help="abort connections after up to this many seconds, 0 keeps them open",
+    )
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
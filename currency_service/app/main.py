@@ -4,11 +4,12 @@ from fastapi import FastAPI
 
 from app.containers.currency_container import Container
 from app.endpoints.currency import currency_router
+from app.utils.responses import JSONResponse
 
 
 def create_app() -> FastAPI:
     container = Container()
-    app = FastAPI()
+    app = FastAPI(default_response_class=JSONResponse)
     app.container = container
     app.include_router(currency_router)
     return app
@@ -0,0 +1,14 @@
+"""Responses rendered with the JSON codec."""
+
+from typing import Any
+
+from fastapi.responses import JSONResponse as _JSONResponse
+
+from app.utils import json_codec
+
+
+class JSONResponse(_JSONResponse):
+    """JSON response rendered with the shared codec."""
+
+    def render(self, content: Any) -> bytes:
+        return json_codec.dumps(content)
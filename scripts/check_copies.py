@@ -0,0 +1,51 @@
+"""Check that modules copied between services are still identical.
+
+docker-compose builds every service from its own directory, so code shared
+by several services can't be imported from one place and is copied instead::
+
+    python scripts/check_copies.py
+
+Exits with status 1 and lists the differing files if any copy has drifted.
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+COPIES = {
+    "json_codec": [
+        "api_gateway/app/utils/json_codec.py",
+        "users_service/app/utils/json_codec.py",
+        "currency_service/app/utils/json_codec.py",
+        "currency_producer/app/json_codec.py",
+        "currency_consumer/app/json_codec.py",
+    ],
+    "ticker_codec": [
+        "currency_producer/app/ticker_codec.py",
+        "currency_consumer/app/ticker_codec.py",
+    ],
+    "responses": [
+        "api_gateway/app/utils/responses.py",
+        "users_service/app/utils/responses.py",
+        "currency_service/app/utils/responses.py",
+    ],
+}
+
+
+def main() -> int:
+    drifted = False
+    for name, paths in COPIES.items():
+        reference, *others = paths
+        expected = (ROOT / reference).read_bytes()
+        for path in others:
+            if (ROOT / path).read_bytes() != expected:
+                print(f"{name}: {path} differs from {reference}")
+                drifted = True
+    if not drifted:
+        print("All copies are identical.")
+    return 1 if drifted else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
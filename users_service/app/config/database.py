@@ -37,6 +37,9 @@ class RedisSettings(BaseSettings):
     db: int = Field(env="REDIS_DB")
     password: str = Field(env="REDIS_PASSWORD")
     default_ttl: int = Field(env="REDIS_DEFAULT_TTL")
+    max_connections: int = Field(env="REDIS_MAX_CONNECTIONS")
+    pool_timeout: float = Field(env="REDIS_POOL_TIMEOUT")
+    auto_pipeline: bool = Field(env="REDIS_AUTO_PIPELINE")
 
     @property
     def url(self) -> str:
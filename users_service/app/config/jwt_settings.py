@@ -6,3 +6,7 @@ class JWTSettings(BaseSettings):
     key: str = Field(env="SECRET_KEY")
     algorithm: str = Field(env="ALGORITHM")
     token_ttl: int = Field(env="ACCESS_TOKEN_EXPIRE_MINUTES")
+    kid: str = Field(env="JWT_KID")
+    public_key: str = Field(env="PUBLIC_KEY")
+    previous_kid: str = Field(env="JWT_PREVIOUS_KID")
+    previous_public_key: str = Field(env="PREVIOUS_PUBLIC_KEY")
@@ -19,12 +19,19 @@ class Container(containers.DeclarativeContainer):
     config.jwt.key.from_env("SECRET_KEY")
     config.jwt.algorithm.from_env("ALGORITHM")
     config.jwt.token_ttl.from_env("ACCESS_TOKEN_EXPIRE_MINUTES")
+    config.jwt.kid.from_env("JWT_KID", default="")
+    config.jwt.public_key.from_env("PUBLIC_KEY", default="")
+    config.jwt.previous_kid.from_env("JWT_PREVIOUS_KID", default="")
+    config.jwt.previous_public_key.from_env("PREVIOUS_PUBLIC_KEY", default="")
 
     config.redis.host.from_env("REDIS_HOST")
     config.redis.port.from_env("REDIS_PORT")
     config.redis.db.from_env("REDIS_DB")
     config.redis.password.from_env("REDIS_PASSWORD")
     config.redis.default_ttl.from_env("REDIS_DEFAULT_TTL")
+    config.redis.max_connections.from_env("REDIS_MAX_CONNECTIONS", default=20)
+    config.redis.pool_timeout.from_env("REDIS_POOL_TIMEOUT", default=1.0)
+    config.redis.auto_pipeline.from_env("REDIS_AUTO_PIPELINE", default=True)
 
     redis_settings = providers.Singleton(
         RedisSettings,
@@ -33,6 +40,9 @@ class Container(containers.DeclarativeContainer):
         db=config.redis.db,
         password=config.redis.password,
         default_ttl=config.redis.default_ttl,
+        max_connections=config.redis.max_connections,
+        pool_timeout=config.redis.pool_timeout,
+        auto_pipeline=config.redis.auto_pipeline,
     )
 
     db = providers.Singleton(Database, db_config=DatabaseConfig.provide())
@@ -42,9 +52,12 @@ class Container(containers.DeclarativeContainer):
         session_factory=db.provided.session,
     )
 
-    redis_repository = providers.Factory(
+    redis_repository = providers.Singleton(
         RedisRepository,
         redis_url=redis_settings.provided.url,
+        max_connections=redis_settings.provided.max_connections,
+        pool_timeout=redis_settings.provided.pool_timeout,
+        auto_pipeline=redis_settings.provided.auto_pipeline,
     )
 
     jwt_setting = providers.Singleton(
@@ -52,6 +65,10 @@ class Container(containers.DeclarativeContainer):
         key=config.jwt.key,
         algorithm=config.jwt.algorithm,
         token_ttl=config.jwt.token_ttl,
+        kid=config.jwt.kid,
+        public_key=config.jwt.public_key,
+        previous_kid=config.jwt.previous_kid,
+        previous_public_key=config.jwt.previous_public_key,
     )
 
     jwt_service = providers.Factory(JWTService, jwt_config=jwt_setting)
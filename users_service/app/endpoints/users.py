@@ -53,6 +53,14 @@ async def verify_token(
     return await users_service.verify_token(token)
 
 
+@users_router.get("/jwks", status_code=200)
+@inject
+async def jwks(
+    users_service: Annotated[UsersService, Depends(Provide[Container.users_service])],
+) -> dict:
+    return await users_service.get_jwks()
+
+
 @users_router.post("/logout", status_code=200)
 @inject
 async def logout(
@@ -1,14 +1,23 @@
 """Application module."""
 
+import logging
+import os
+
 from fastapi import FastAPI
 
 from app.containers.users_container import Container
 from app.endpoints.users import users_router
+from app.utils.responses import JSONResponse
+
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s level=%(levelname)s logger=%(name)s %(message)s",
+)
 
 
 def create_app() -> FastAPI:
     container = Container()
-    app = FastAPI()
+    app = FastAPI(default_response_class=JSONResponse)
     app.container = container
     app.include_router(users_router)
     return app
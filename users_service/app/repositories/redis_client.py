@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import time
+
+from redis.asyncio import BlockingConnectionPool, Redis
+
+logger = logging.getLogger(__name__)
+
+# Pipelining stats are logged at most this often, in seconds.
+STATS_LOG_INTERVAL = 60.0
+
+
+class AutoPipelineRedis(Redis):
+    """Redis client that sends the commands of one event loop tick together.
+
+    Commands are queued instead of being sent right away, and the queue is
+    flushed as a single non-transactional pipeline on the next loop
+    iteration. Concurrent requests then share round trips and connections.
+    Each command still gets its own result or error. Explicit pipelines,
+    pub/sub and scan iterators work as usual.
+
+    Batch sizes and batches in flight, each holding one connection while it
+    runs, are logged every ``STATS_LOG_INTERVAL`` seconds together with the
+    connections checked out of the pool at that moment.
+    """
+
+    def __init__(self, *args, max_batch_size: int = 512, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_batch_size = max_batch_size
+        self.__queue: list[tuple[tuple, dict, asyncio.Future]] = []
+        self.__flush_scheduled = False
+        self.__batches: set[asyncio.Task] = set()
+        self.__stats = {"batches": 0, "commands": 0, "batches_in_flight": 0}
+        self.__stats_logged_at = time.monotonic()
+
+    def stats(self) -> dict[str, int]:
+        """Batches and commands sent so far, batches and connections in use now.
+
+        Connections can also be held by pub/sub or explicit pipelines.
+        """
+        return {
+            **self.__stats,
+            "in_use_connections": self.in_use_connections(),
+            "max_connections": self.connection_pool.max_connections,
+        }
+
+    def in_use_connections(self) -> int:
+        """Connections currently checked out of the pool."""
+        # redis-py has no public accessor for this.
+        return len(self.connection_pool._in_use_connections)
+
+    def execute_command(self, *args, **options) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.__queue.append((args, options, future))
+        if len(self.__queue) >= self.max_batch_size:
+            self.__flush()
+        elif not self.__flush_scheduled:
+            self.__flush_scheduled = True
+            loop.call_soon(self.__flush)
+        return future
+
+    def __flush(self) -> None:
+        self.__flush_scheduled = False
+        batch, self.__queue = self.__queue, []
+        if not batch:
+            return
+        task = asyncio.create_task(self.__execute(batch))
+        self.__batches.add(task)
+        task.add_done_callback(self.__batches.discard)
+
+    async def __execute(self, batch: list[tuple[tuple, dict, asyncio.Future]]) -> None:
+        self.__stats["batches"] += 1
+        self.__stats["commands"] += len(batch)
+        self.__stats["batches_in_flight"] += 1
+        self.__log_stats()
+        try:
+            async with self.pipeline(transaction=False) as pipe:
+                for args, options, _ in batch:
+                    pipe.execute_command(*args, **options)
+                results = await pipe.execute(raise_on_error=False)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.__stats["batches_in_flight"] -= 1
+
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def __log_stats(self) -> None:
+        now = time.monotonic()
+        if now - self.__stats_logged_at < STATS_LOG_INTERVAL:
+            return
+        self.__stats_logged_at = now
+        stats = self.stats()
+        logger.info(
+            "Redis auto-pipeline batches=%d commands=%d avg_batch=%.1f "
+            "batches_in_flight=%d in_use_connections=%d max_connections=%d",
+            stats["batches"],
+            stats["commands"],
+            stats["commands"] / stats["batches"],
+            stats["batches_in_flight"],
+            stats["in_use_connections"],
+            stats["max_connections"],
+        )
+
+
+def create_redis_client(
+    redis_url: str, max_connections: int, pool_timeout: float, auto_pipeline: bool
+) -> Redis:
+    """Build the client shared by the whole process.
+
+    The pool holds at most ``max_connections`` connections, callers wait up
+    to ``pool_timeout`` seconds for a free one.
+    """
+    pool = BlockingConnectionPool.from_url(
+        redis_url, max_connections=max_connections, timeout=pool_timeout
+    )
+    if auto_pipeline:
+        return AutoPipelineRedis(connection_pool=pool)
+    return Redis(connection_pool=pool)
@@ -1,19 +1,24 @@
 # redis_repository.py
-from redis.asyncio import ConnectionPool, Redis
 import hashlib
 import logging
 
+from app.repositories.redis_client import create_redis_client
+
 logger = logging.getLogger(__name__)
 
 
 class RedisRepository:
-    def __init__(self, redis_url):
+    def __init__(
+        self, redis_url, max_connections=20, pool_timeout=1.0, auto_pipeline=True
+    ):
         self.redis_url = redis_url
         print(f"Connecting to Redis with URL: {self.redis_url}")
         try:
-            self.redis = Redis(
-                connection_pool=ConnectionPool.from_url(self.redis_url),
-                encoding="utf-8",
+            self.redis = create_redis_client(
+                self.redis_url,
+                max_connections=max_connections,
+                pool_timeout=pool_timeout,
+                auto_pipeline=auto_pipeline,
             )
             print("Redis connection created successfully")
         except Exception as e:
@@ -75,6 +80,13 @@ class RedisRepository:
             print(f"Error in Redis DEL operation: {e}")
             return False
 
+    async def publish(self, channel, message):
+        try:
+            return await self.redis.publish(channel, message)
+        except Exception as e:
+            print(f"Error in Redis PUBLISH operation: {e}")
+            return 0
+
     # Новые методы для работы с JWT токенами
     @staticmethod
     def _get_jwt_fingerprint(token: str) -> str:
@@ -97,9 +109,12 @@ class RedisRepository:
         return await self.delete(cache_key)
 
     async def blacklist_jwt_token(self, token: str, ttl: int = 300) -> bool:
-        """Add JWT token to blacklist in Redis."""
-        cache_key = f"black_list_jwt:{self._get_jwt_fingerprint(token)}"
-        return await self.set(key=cache_key, value=token, ttl=ttl)
+        """Add JWT token to blacklist in Redis and notify the gateways."""
+        fingerprint = self._get_jwt_fingerprint(token)
+        # Gateways that get the notification must find the key already set.
+        result = await self.set(key=f"black_list_jwt:{fingerprint}", value=token, ttl=ttl)
+        await self.publish("jwt:revoked", fingerprint)
+        return result
 
     async def is_jwt_token_blacklisted(self, token: str) -> bool:
         """Check if JWT token is blacklisted."""
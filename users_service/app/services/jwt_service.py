@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta
 
 from fastapi import HTTPException
-from jose import JWTError, jwt
+from jose import JWTError, jwk, jwt
 from typing import Optional
 
 from starlette import status
@@ -22,7 +22,10 @@ class JWTService:
         )
         to_encode.update({"exp": expire})
         encoded_jwt = jwt.encode(
-            to_encode, self.jwt_config.key, algorithm=self.jwt_config.algorithm
+            to_encode,
+            self.jwt_config.key,
+            algorithm=self.jwt_config.algorithm,
+            headers={"kid": self.jwt_config.kid} if self.jwt_config.kid else None,
         )
         return encoded_jwt
 
@@ -30,7 +33,7 @@ class JWTService:
         try:
             payload = jwt.decode(
                 token,
-                self.jwt_config.key,
+                self.jwt_config.public_key or self.jwt_config.key,
                 options={"verify_signature": True},
                 algorithms=[self.jwt_config.algorithm],
             )
@@ -40,3 +43,21 @@ class JWTService:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Token expired {e}",
             )
+
+    def jwks(self) -> dict:
+        """Public keys the gateway uses to verify tokens locally.
+
+        Only asymmetric algorithms publish keys, the previous key stays in the
+        set during a rotation until the tokens it signed expire.
+        """
+        keys = []
+        for kid, public_key in (
+            (self.jwt_config.kid, self.jwt_config.public_key),
+            (self.jwt_config.previous_kid, self.jwt_config.previous_public_key),
+        ):
+            if not public_key:
+                continue
+            key = jwk.construct(public_key, self.jwt_config.algorithm).to_dict()
+            key.update({"kid": kid, "use": "sig"})
+            keys.append(key)
+        return {"keys": keys}
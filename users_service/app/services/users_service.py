@@ -38,6 +38,9 @@ class UsersService:
     async def verify_token(self, token: str):
         return self.jwt_service.verify_access_token(token)
 
+    async def get_jwks(self) -> dict:
+        return self.jwt_service.jwks()
+
     async def confirm_email(
         self,
         dto: UserConfirm,
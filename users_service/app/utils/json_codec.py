@@ -0,0 +1,46 @@
+"""JSON encoding shared by the services, their caches and Kafka messages.
+
+Backed by orjson, which handles UUID, datetime, date, time, enums and
+dataclasses natively. Pydantic models, decimals and sets are converted in
+``_default``.
+
+Every service is built from its own Docker context, so this module is copied
+into each of them. ``scripts/check_copies.py`` checks the copies are identical.
+"""
+
+from decimal import Decimal
+from functools import partial
+from typing import Any, Callable
+
+import orjson
+
+OPTIONS = orjson.OPT_NON_STR_KEYS
+
+JSONDecodeError = orjson.JSONDecodeError
+
+
+def _default(obj: Any, fallback: Callable[[Any], Any] | None = None) -> Any:
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if fallback is not None:
+        return fallback(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(obj: Any, default: Callable[[Any], Any] | None = None) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes.
+
+    ``default`` is called for objects the codec itself can't encode.
+    """
+    if default is not None:
+        return orjson.dumps(obj, default=partial(_default, fallback=default), option=OPTIONS)
+    return orjson.dumps(obj, default=_default, option=OPTIONS)
+
+
+def loads(data: bytes | bytearray | memoryview | str) -> Any:
+    return orjson.loads(data)
+